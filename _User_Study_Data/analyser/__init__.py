@@ -0,0 +1,41 @@
+import importlib
+
+# Analysis of the user study's data, run with "python -m analyser" (or "python _Analyser.py") from the data directory.
+# Submodules are only imported when one of their names is first used, so a script that only needs e.g.
+# score_spatial_graphs doesn't pay for pandas, scipy and the rest of the analysis at startup.
+
+submodule_names = {
+    "rooms": ["get_rooms_info", "RoomIndex", "get_room_index", "in_room"],
+    "quaternions": ["angle", "angles", "step_angles", "cumulative_turns", "angular_velocities", "slerp"],
+    "trajectories": ["parse_trajectory", "load_trajectory", "iter_trajectory_chunks", "PathAccumulator"],
+    "spatial": ["get_graph", "get_adjacency_matrix", "get_degrees", "score_spatial_graphs"],
+    "users": ["UserInfo", "read_trajectory", "read_trajectory_chunks", "read_participant_trajectory", "read_participant_labels", "read_participant_data", "get_user_info", "get_user_infos"],
+    "surveys": ["read_survey", "get_prestudy_infos", "get_poststudy_infos", "infer_survey_infos"],
+    "statistics": ["round_sig", "get_compared_variables", "get_metrics_table", "compare_all_conditions", "print_comparison", "compare_conditions", "write_results"],
+    "log_data": ["load_log_data"],
+    "cache": ["ArrayCache", "get_file_signature"],
+    "workers": ["map_in_workers"],
+    "resampling": ["resample_conditions"],
+    "profiling": ["profiler", "profiled"],
+    "store": ["MetricsStore"],
+    "downsampling": ["resample_trajectory", "simplify_trajectory", "Downsampler", "get_path_drift", "write_drift_report"],
+    "heatmaps": ["OccupancyGrid", "build_heatmaps", "render_heatmaps"],
+    "visits": ["VisitIndex", "get_visit_index", "build_visit_indexes"],
+    "live": ["LiveSession", "watch_participant", "run_live"],
+    "similarity": ["get_room_sequence", "get_edit_distance", "get_dtw_distance", "get_distance_matrix", "get_similarity_matrices", "get_similarity_metrics", "get_square_matrix", "write_similarity"],
+}
+
+submodules = {name: submodule for submodule, names in submodule_names.items() for name in names}
+
+__all__ = list(submodules.keys())
+
+def __getattr__(name):
+    if name not in submodules:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module("." + submodules[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
@@ -0,0 +1,164 @@
+import os
+import argparse
+from .rooms import get_rooms_info
+from .users import get_user_infos
+from .statistics import get_compared_variables, get_metrics_table, compare_all_conditions, print_comparison, write_results
+from .cache import ArrayCache
+from .store import MetricsStore
+from .downsampling import Downsampler, write_drift_report
+from .heatmaps import build_heatmaps, render_heatmaps
+from .live import run_live
+from .visits import build_visit_indexes, print_visit_queries
+from .similarity import get_similarity_matrices, get_similarity_metrics, write_similarity
+from .profiling import profiler
+
+###########################################################################
+
+def main(workers = 1, cache = None, chunk_size = None, results_filename = None, resamples = 0, seed = 0, store = None, downsampler = None, drift_filename = None, heatmaps_directory = None, heatmap_cell_size = 0.1, similarity_filename = None, similarity_rate = 1, similarity_cutoff = None, visit_indexes = False):
+    rooms_info = get_rooms_info()
+    user_infos = get_user_infos(32, rooms_info, workers, cache, chunk_size, store, downsampler)
+
+    if drift_filename is not None:
+        write_drift_report(user_infos, drift_filename)
+
+    if visit_indexes:
+        build_visit_indexes(32, rooms_info, workers, cache)
+
+    if heatmaps_directory is not None:
+        grids, heatmaps_info = build_heatmaps(32, rooms_info, heatmaps_directory, heatmap_cell_size, workers, cache)
+        render_heatmaps(grids, heatmaps_info, rooms_info, os.path.join(heatmaps_directory, "heatmaps.png"))
+
+    print()
+
+    metrics = get_metrics_table(user_infos, get_compared_variables())
+    if similarity_filename is not None:
+        # Each participant's mean distance to the others of their condition is compared like the other variables
+        ids, matrices = get_similarity_matrices(user_infos, rooms_info, similarity_rate, similarity_cutoff, workers, cache)
+        write_similarity(ids, matrices, similarity_filename)
+        metrics = metrics.join(get_similarity_metrics(ids, matrices, similarity_cutoff))
+
+    results = compare_all_conditions(metrics, resamples, seed, workers)
+    for _, result in results.iterrows():
+        print_comparison(result)
+
+    if results_filename is not None:
+        write_results(results, results_filename)
+
+    print()
+    print("Done")
+
+def run(argv = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used to read participants' data")
+    parser.add_argument("--chunk-size", type=int, default=None, help="stream the .txt recordings in blocks of this many samples, keeping memory use bounded")
+    parser.add_argument("--results", default=None, help="also write the condition comparisons to this .csv or .json file")
+    parser.add_argument("--resamples", type=int, default=0, help="number of permutations and bootstrap resamples per comparison (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the permutations and bootstrap resamples")
+    parser.add_argument("--cache", action="store_true", help="reuse parsed trajectories and room labels saved in the cache directory")
+    parser.add_argument("--cache-dir", default="_Cache", help="directory of the trajectory cache")
+    parser.add_argument("--cache-size", type=int, default=1024, help="size cap of the trajectory cache in MB")
+    parser.add_argument("--rebuild-cache", action="store_true", help="delete the trajectory cache and rebuild it during this run")
+    parser.add_argument("--clear-cache", action="store_true", help="delete the trajectory cache and exit")
+    parser.add_argument("--incremental", action="store_true", help="reuse the stored metrics of participants whose input files haven't changed")
+    parser.add_argument("--store", default="_Metrics.json", help="file of the stored per-participant metrics")
+    parser.add_argument("--store-hash", action="store_true", help="detect changed input files by their contents' hash rather than their modification time")
+    parser.add_argument("--resample-rate", type=float, default=None, help="resample trajectories at this rate (Hz) before computing path metrics")
+    parser.add_argument("--simplify-tolerance", type=float, default=None, help="simplify trajectories to within this distance (m) of every sample before computing path metrics")
+    parser.add_argument("--simplify-angle", type=float, default=None, help="simplify trajectories to within this angle (degrees) of every sample's rotation")
+    parser.add_argument("--drift-report", default=None, help="write how far the downsampled path metrics are from the full resolution ones to this .json file")
+    parser.add_argument("--heatmaps", default=None, help="write per-condition occupancy grids and their heatmaps to this directory")
+    parser.add_argument("--heatmap-cell-size", type=float, default=0.1, help="cell size (m) of the occupancy grids")
+    parser.add_argument("--similarity", default=None, help="write room sequence and path distance matrices between participants to this .npz file, and compare the conditions' mean distances")
+    parser.add_argument("--similarity-rate", type=float, default=1, help="rate (Hz) the paths are resampled at before comparing them")
+    parser.add_argument("--similarity-cutoff", type=float, default=None, help="skip path pairs further apart than this mean distance (m), counting them as this distance")
+    parser.add_argument("--live", type=int, default=None, help="print this participant's path metrics as samples arrive, instead of the analysis. --live-stdin and --live-port are the only live feeds (nothing in the Unity project sends to them yet); without them, the recording (<id>.txt) is read once the game writes it at the end of the session")
+    parser.add_argument("--live-stdin", action="store_true", help="read the live samples from stdin")
+    parser.add_argument("--live-port", type=int, default=None, help="read the live samples from a connection to this local port")
+    parser.add_argument("--live-interval", type=float, default=1, help="seconds between printed live metrics")
+    parser.add_argument("--live-wait", type=float, default=None, help="give up after this many seconds if the recording hasn't been written (no limit by default)")
+    parser.add_argument("--live-idle", type=float, default=10, help="stop reading the recording after this many seconds without new samples")
+    parser.add_argument("--visit-index", action="store_true", help="save each participant's visit timeline (<id>.visits.npz) next to their recording")
+    parser.add_argument("--visits", type=int, default=None, help="answer timeline queries about this participant from their visit index (built if needed), instead of the analysis")
+    parser.add_argument("--visits-at", type=float, default=None, help="time (s) to find the participant's room at")
+    parser.add_argument("--visits-window", type=float, nargs=2, default=None, help="start and end time (s) of the window to find the visits, distance and turn in")
+    parser.add_argument("--visits-room", default=None, help="room to find the first visit of, and the time spent in (within --visits-window)")
+    parser.add_argument("--profile", default=None, help="write a per-participant, per-stage timing report (.json) to this file")
+    parser.add_argument("--profile-memory", action="store_true", help="also trace the peak memory of each stage in the profile report (slow)")
+    parser.add_argument("--profile-calls", default=None, help="also write cProfile statistics of this process to this file")
+    args = parser.parse_args(argv)
+
+    if args.live is None and (args.live_stdin or args.live_port is not None or args.live_wait is not None):
+        parser.error("--live-stdin, --live-port and --live-wait need --live")
+    if args.live_stdin and args.live_port is not None:
+        parser.error("--live-stdin and --live-port can't be used together")
+
+    if args.visits is None and (args.visits_at is not None or args.visits_window is not None or args.visits_room is not None):
+        parser.error("--visits-at, --visits-window and --visits-room need --visits")
+
+    if args.profile is None and (args.profile_memory or args.profile_calls is not None):
+        parser.error("--profile-memory and --profile-calls need --profile")
+
+    downsampling = args.resample_rate is not None or args.simplify_tolerance is not None or args.simplify_angle is not None
+    if args.drift_report is not None and not downsampling:
+        parser.error("--drift-report needs --resample-rate, --simplify-tolerance or --simplify-angle")
+    if downsampling and args.chunk_size is not None:
+        parser.error("downsampling isn't supported with --chunk-size")
+    if args.resample_rate is not None and args.resample_rate <= 0:
+        parser.error("--resample-rate must be positive")
+    if args.simplify_tolerance is not None and args.simplify_tolerance <= 0:
+        parser.error("--simplify-tolerance must be positive")
+    if args.simplify_angle is not None and args.simplify_angle <= 0:
+        parser.error("--simplify-angle must be positive")
+    if args.heatmap_cell_size <= 0:
+        parser.error("--heatmap-cell-size must be positive")
+    if args.similarity_rate <= 0:
+        parser.error("--similarity-rate must be positive")
+
+    cache = ArrayCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    if args.clear_cache or args.rebuild_cache:
+        cache.clear()
+    if args.clear_cache:
+        print("Cleared cache '" + args.cache_dir + "'")
+        raise SystemExit
+
+    if args.live is not None:
+        run_live(args.live, get_rooms_info(), args.live_stdin, args.live_port, args.live_interval, args.live_idle, args.live_wait)
+        raise SystemExit
+
+    if args.visits is not None:
+        print_visit_queries(args.visits, get_rooms_info(), args.visits_at, args.visits_window, args.visits_room, cache if args.cache or args.rebuild_cache else None)
+        raise SystemExit
+
+    if args.profile is not None:
+        profiler.start(args.profile_memory, args.profile_calls is not None)
+
+    store = MetricsStore(args.store, args.store_hash) if args.incremental else None
+
+    downsampler = Downsampler(args.resample_rate, args.simplify_tolerance, args.simplify_angle, args.drift_report is not None) if downsampling else None
+
+    main(
+        workers=args.workers,
+        cache=cache if args.cache or args.rebuild_cache else None,
+        chunk_size=args.chunk_size,
+        results_filename=args.results,
+        resamples=args.resamples,
+        seed=args.seed,
+        store=store,
+        downsampler=downsampler,
+        drift_filename=args.drift_report,
+        heatmaps_directory=args.heatmaps,
+        heatmap_cell_size=args.heatmap_cell_size,
+        similarity_filename=args.similarity,
+        similarity_rate=args.similarity_rate,
+        similarity_cutoff=args.similarity_cutoff,
+        visit_indexes=args.visit_index,
+    )
+
+    if args.profile is not None:
+        profiler.stop()
+        profiler.write_report(args.profile)
+        if args.profile_calls is not None:
+            profiler.write_call_stats(args.profile_calls)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,364 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import argparse
+import platform
+import tempfile
+import warnings
+import contextlib
+import numpy as np
+import pandas as pd
+from .log_data import load_log_data
+from .rooms import get_rooms_info, get_room_index
+from .trajectories import load_trajectory
+from .downsampling import resample_trajectory, simplify_trajectory
+from .spatial import get_graph, score_spatial_graphs
+from .users import UserInfo, get_user_infos
+from .surveys import infer_survey_infos
+from .statistics import get_metrics_table, get_compared_variables, compare_all_conditions
+from .similarity import get_similarity_matrices
+
+# Times each stage of the analysis on a synthetic cohort, so regressions and the gains of optimisations can be tracked.
+# The cohort is written to a working directory in the same layout as the study's data: "<id>.txt" and "<id>.dat"
+# recordings, "Spatial_<id>.txt" graphs and Qualtrics-shaped "prestudy.csv" / "poststudy.csv" surveys.
+# Timings are reported as JSON, which can be saved as a baseline and compared against in later runs.
+
+###########################################################################
+
+#region Synthetic Data
+
+def get_room_walk(rng, truth_graph, visit_count):
+    # Rooms visited in order, walking along the truth graph's edges from the start room
+    rooms = ["Start"]
+    while len(rooms) < visit_count:
+        neighbours = sorted(truth_graph.neighbors(rooms[-1]))
+        rooms.append(neighbours[rng.integers(len(neighbours))] if len(neighbours) > 0 else rooms[-1])
+
+    return rooms
+
+def make_trajectory(rng, rooms_info, truth_graph, portals, sample_count, sample_rate = 72, visit_time = 20):
+    # (N, 8) trajectory of a head wandering around each room of a walk, jumping between rooms as if through a portal
+    portal_mutlipler = 100 if portals else 1
+    visit_length = sample_rate * visit_time
+    rooms = get_room_walk(rng, truth_graph, max(1, -(-sample_count // visit_length)))
+
+    room_centres = np.array([rooms_info[room] for room in rooms], dtype=float) * [3 * portal_mutlipler, 6 * portal_mutlipler]
+    centres = room_centres[np.arange(sample_count) // visit_length]
+
+    # Smooth offsets that stay inside the room bounds (±1.5 in x, ±3 in z)
+    phases = np.cumsum(rng.normal(0, 0.01, size=(sample_count, 2)), axis=0) + rng.uniform(0, 2 * np.pi, size=2)
+    offsets = np.sin(phases) * [1.2, 2.4]
+
+    times = np.cumsum(rng.uniform(0.9, 1.1, size=sample_count) / sample_rate)
+    heights = 1.6 + rng.normal(0, 0.01, size=sample_count)
+
+    # Head rotation from a slowly turning yaw and a small pitch
+    yaws = np.cumsum(rng.normal(0, 0.02, size=sample_count))
+    pitches = 0.2 * np.sin(np.cumsum(rng.normal(0, 0.01, size=sample_count)))
+    rotations = np.column_stack((
+        np.sin(pitches / 2) * np.cos(yaws / 2),
+        np.cos(pitches / 2) * np.sin(yaws / 2),
+        -np.sin(pitches / 2) * np.sin(yaws / 2),
+        np.cos(pitches / 2) * np.cos(yaws / 2)
+    ))
+
+    return np.column_stack((times, centres[:, 0] + offsets[:, 0], heights, centres[:, 1] + offsets[:, 1], rotations))
+
+def write_trajectory(filename, trajectory):
+    # 7 significant digits, like the recordings written by Unity
+    np.savetxt(filename, trajectory, fmt="%.7g", delimiter=",")
+
+def get_length_prefixed_string(value):
+    data = value.encode("utf-8")
+
+    length = len(data)
+    prefix = b""
+    while length >= 0x80:
+        prefix += bytes([(length & 0x7f) | 0x80])
+        length >>= 7
+
+    return prefix + bytes([length]) + data
+
+def write_log_data(filename, trajectory):
+    # Writes the records BinaryFormatter writes for a LogData with the given motion infos, as read by log_data
+    assembly_name = "Assembly-CSharp, Version=0.0.0.0, Culture=neutral, PublicKeyToken=null"
+    list_name = "System.Collections.Generic.List`1[[LogData+MotionInfo, " + assembly_name + "]]"
+    count = len(trajectory)
+    capacity = max(4, 1 << (count - 1).bit_length()) if count > 0 else 0
+
+    # Object IDs: LogData 1, list 3, items array 4, motion infos from 5, then their position and rotation arrays
+    motion_ids = 5 + np.arange(count)
+    position_ids = 5 + count + 2 * np.arange(count)
+    rotation_ids = position_ids + 1
+
+    header = struct.pack("<Biiii", 0, 1, -1, 1, 0)
+    header += struct.pack("<Bi", 12, 2) + get_length_prefixed_string(assembly_name)
+    header += struct.pack("<Bi", 5, 1) + get_length_prefixed_string("LogData") + struct.pack("<i", 1) + get_length_prefixed_string("_motionInfos")
+    header += bytes([3]) + get_length_prefixed_string(list_name) + struct.pack("<i", 2) + struct.pack("<Bi", 9, 3)
+    header += struct.pack("<Bi", 4, 3) + get_length_prefixed_string(list_name) + struct.pack("<i", 3)
+    header += get_length_prefixed_string("_items") + get_length_prefixed_string("_size") + get_length_prefixed_string("_version")
+    header += bytes([4, 0, 0]) + get_length_prefixed_string("LogData+MotionInfo[]") + struct.pack("<i", 2) + bytes([8, 8])
+    header += struct.pack("<Bi", 9, 4) + struct.pack("<ii", count, count)
+    header += struct.pack("<BiBii", 7, 4, 0, 1, capacity) + bytes([4]) + get_length_prefixed_string("LogData+MotionInfo") + struct.pack("<i", 2)
+
+    references = np.zeros(count, dtype=[("record", "u1"), ("id", "<i4")])
+    references["record"] = 9
+    references["id"] = motion_ids
+
+    nulls = b""
+    if capacity > count:
+        nulls = struct.pack("<BB", 13, capacity - count) if capacity - count < 256 else struct.pack("<Bi", 14, capacity - count)
+
+    # The first motion info carries the class metadata, the rest refer back to it
+    motion_infos = b""
+    if count > 0:
+        motion_infos = struct.pack("<Bi", 5, motion_ids[0]) + get_length_prefixed_string("LogData+MotionInfo") + struct.pack("<i", 3)
+        motion_infos += get_length_prefixed_string("_time") + get_length_prefixed_string("_position") + get_length_prefixed_string("_rotation")
+        motion_infos += bytes([0, 7, 7, 11, 11, 11]) + struct.pack("<i", 2)
+        motion_infos += struct.pack("<fBiBi", trajectory[0, 0], 9, position_ids[0], 9, rotation_ids[0])
+
+    later_motion_infos = np.zeros(max(0, count - 1), dtype=[("record", "u1"), ("id", "<i4"), ("metadata_id", "<i4"), ("time", "<f4"), ("position_record", "u1"), ("position_id", "<i4"), ("rotation_record", "u1"), ("rotation_id", "<i4")])
+    later_motion_infos["record"] = 1
+    later_motion_infos["id"] = motion_ids[1:]
+    later_motion_infos["metadata_id"] = 5
+    later_motion_infos["time"] = trajectory[1:, 0]
+    later_motion_infos["position_record"] = 9
+    later_motion_infos["position_id"] = position_ids[1:]
+    later_motion_infos["rotation_record"] = 9
+    later_motion_infos["rotation_id"] = rotation_ids[1:]
+
+    arrays = np.zeros(count, dtype=[("position_record", "u1"), ("position_id", "<i4"), ("position_length", "<i4"), ("position_type", "u1"), ("position", "<f4", 3), ("rotation_record", "u1"), ("rotation_id", "<i4"), ("rotation_length", "<i4"), ("rotation_type", "u1"), ("rotation", "<f4", 4)])
+    arrays["position_record"] = 15
+    arrays["position_id"] = position_ids
+    arrays["position_length"] = 3
+    arrays["position_type"] = 11
+    arrays["position"] = trajectory[:, 1:4]
+    arrays["rotation_record"] = 15
+    arrays["rotation_id"] = rotation_ids
+    arrays["rotation_length"] = 4
+    arrays["rotation_type"] = 11
+    arrays["rotation"] = trajectory[:, 4:8]
+
+    with open(filename, "wb") as file:
+        for part in (header, references.tobytes(), nulls, motion_infos, later_motion_infos.tobytes(), arrays.tobytes(), bytes([11])):
+            file.write(part)
+
+def write_spatial_graph(filename, graph):
+    with open(filename, "w") as file:
+        for room_name in graph.nodes():
+            file.write(room_name + "=" + ",".join(graph.neighbors(room_name)) + "\n")
+
+def make_spatial_graph(rng, truth_graph):
+    # The truth graph with some connections forgotten and some made up
+    graph = truth_graph.copy()
+    graph.remove_edges_from([edge for edge in truth_graph.edges() if rng.random() < 0.2])
+
+    room_names = list(truth_graph.nodes())
+    for _ in range(rng.integers(0, 4)):
+        left_room, right_room = rng.choice(len(room_names), size=2, replace=False)
+        graph.add_edge(room_names[left_room], room_names[right_room])
+
+    return graph
+
+def write_survey(filename, template_filename, rng, count):
+    # Keeps the template's header and 3 Qualtrics rows, followed by resampled answers relabelled with the cohort's IDs
+    template = pd.read_csv(template_filename, header=None, dtype=str, keep_default_na=False)
+    answers = template.iloc[4:]
+
+    survey = answers.iloc[rng.integers(0, len(answers), size=count)].copy()
+    survey.iloc[:, 0] = [str(id) for id in rng.permutation(count)]
+
+    pd.concat((template.iloc[:4], survey)).to_csv(filename, header=False, index=False)
+
+def make_cohort(directory, count, sample_count, seed = 0, write_dat = True):
+    rng = np.random.default_rng(seed)
+    data_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    rooms_info = get_rooms_info()
+
+    os.makedirs(directory, exist_ok=True)
+    shutil.copyfile(os.path.join(data_directory, "Spatial_Truth.txt"), os.path.join(directory, "Spatial_Truth.txt"))
+
+    cwd = os.getcwd()
+    try:
+        os.chdir(directory)
+        truth_graph = get_graph("Truth", rooms_info)
+    finally:
+        os.chdir(cwd)
+
+    for id in range(count):
+        trajectory = make_trajectory(rng, rooms_info, truth_graph, (id % 2) == 1, sample_count)
+        write_trajectory(os.path.join(directory, str(id) + ".txt"), trajectory)
+        if write_dat:
+            write_log_data(os.path.join(directory, str(id) + ".dat"), trajectory)
+
+        write_spatial_graph(os.path.join(directory, "Spatial_" + str(id) + ".txt"), make_spatial_graph(rng, truth_graph))
+
+    write_survey(os.path.join(directory, "prestudy.csv"), os.path.join(data_directory, "prestudy.csv"), rng, count)
+    write_survey(os.path.join(directory, "poststudy.csv"), os.path.join(data_directory, "poststudy.csv"), rng, count)
+
+#endregion
+
+###########################################################################
+
+#region Benchmarks
+
+def time_stage(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    return {"best": min(times), "median": float(np.median(times)), "times": times}
+
+def run_benchmarks(count, repeat = 3, workers = 1, include_dat = True):
+    # Times each stage over the whole cohort in the current directory, reusing the previous stage's outputs
+    rooms_info = get_rooms_info()
+    ids = list(range(count))
+    portals = [(id % 2) == 1 for id in ids]
+
+    trajectories = [load_trajectory(str(id) + ".txt") for id in ids]
+    labels = [get_room_index(rooms_info, portals[id]).locate(trajectories[id][:, 1], trajectories[id][:, 3]) for id in ids]
+    truth_graph = get_graph("Truth", rooms_info)
+
+    user_infos = {}
+    for id in ids:
+        user_infos[id] = UserInfo()
+        user_infos[id].infer_path_info(trajectories[id], rooms_info, portals[id], labels[id])
+        user_infos[id].infer_spatial_info(get_graph(id, rooms_info), truth_graph)
+    infer_survey_infos(user_infos)
+    metrics = get_metrics_table(user_infos, get_compared_variables())
+
+    def parse_txt():
+        for id in ids:
+            load_trajectory(str(id) + ".txt")
+
+    def parse_dat():
+        for id in ids:
+            load_log_data(str(id) + ".dat")
+
+    def label_rooms():
+        for id in ids:
+            get_room_index(rooms_info, portals[id]).locate(trajectories[id][:, 1], trajectories[id][:, 3])
+
+    def path_metrics():
+        for id in ids:
+            UserInfo().infer_path_info(trajectories[id], rooms_info, portals[id], labels[id])
+
+    def resampling():
+        for id in ids:
+            resample_trajectory(trajectories[id], labels[id], 30)
+
+    def simplification():
+        for id in ids:
+            simplify_trajectory(trajectories[id], labels[id], 0.01, 0.5)
+
+    def spatial_scoring():
+        id_graphs = [get_graph(id, rooms_info) for id in ids]
+        score_spatial_graphs(id_graphs, [list(user_infos[id].data["path"]["visited"].keys()) for id in ids], truth_graph)
+
+    def survey_extraction():
+        infer_survey_infos({id: UserInfo() for id in ids})
+
+    def statistics():
+        compare_all_conditions(get_metrics_table(user_infos, get_compared_variables()))
+
+    def similarity():
+        get_similarity_matrices(user_infos, rooms_info, 1, None, workers)
+
+    def end_to_end():
+        with contextlib.redirect_stdout(io.StringIO()):
+            compare_all_conditions(get_metrics_table(get_user_infos(count, rooms_info, workers), get_compared_variables()))
+
+    stages = {}
+    stages["parse_txt"] = time_stage(parse_txt, repeat)
+    if include_dat:
+        stages["parse_dat"] = time_stage(parse_dat, repeat)
+    stages["label_rooms"] = time_stage(label_rooms, repeat)
+    stages["path_metrics"] = time_stage(path_metrics, repeat)
+    stages["resampling"] = time_stage(resampling, repeat)
+    stages["simplification"] = time_stage(simplification, repeat)
+    stages["spatial_scoring"] = time_stage(spatial_scoring, repeat)
+    stages["survey_extraction"] = time_stage(survey_extraction, repeat)
+    stages["statistics"] = time_stage(statistics, repeat)
+    stages["similarity"] = time_stage(similarity, repeat)
+    stages["end_to_end"] = time_stage(end_to_end, repeat)
+
+    return stages, len(metrics.columns)
+
+def compare_to_baseline(report, baseline, tolerance):
+    # Prints each stage's best time against the baseline's, returning the stages that got slower than the tolerance allows
+    regressions = []
+    for stage, timing in report["stages"].items():
+        if stage not in baseline["stages"]:
+            print(f"{stage}: {timing['best']:.4f}s (not in baseline)")
+            continue
+
+        baseline_time = baseline["stages"][stage]["best"]
+        ratio = timing["best"] / baseline_time if baseline_time > 0 else float("inf")
+        print(f"{stage}: {timing['best']:.4f}s (baseline {baseline_time:.4f}s, x{ratio:.2f})")
+
+        if ratio > 1 + tolerance:
+            regressions.append(stage)
+
+    return regressions
+
+#endregion
+
+###########################################################################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--participants", type=int, default=32, help="number of synthetic participants")
+    parser.add_argument("--samples", type=int, default=20000, help="number of samples in each synthetic recording")
+    parser.add_argument("--repeat", type=int, default=3, help="number of times each stage is timed (the best is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the synthetic cohort")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used by the similarity and end to end stages")
+    parser.add_argument("--no-dat", action="store_true", help="skip writing and timing the .dat recordings")
+    parser.add_argument("--directory", default=None, help="write the synthetic cohort to this directory and keep it (a temporary directory otherwise)")
+    parser.add_argument("--output", default=None, help="write the timings to this .json file (printed otherwise)")
+    parser.add_argument("--baseline", default=None, help="compare the timings against a .json file written by an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="fraction a stage may be slower than the baseline before it counts as a regression")
+    args = parser.parse_args()
+
+    # Small synthetic cohorts can make scipy warn about nearly identical samples
+    warnings.simplefilter("ignore", RuntimeWarning)
+
+    directory = args.directory if args.directory is not None else tempfile.mkdtemp(prefix="benchmark_")
+    cwd = os.getcwd()
+    try:
+        start = time.perf_counter()
+        make_cohort(directory, args.participants, args.samples, args.seed, not args.no_dat)
+        generation_time = time.perf_counter() - start
+
+        os.chdir(directory)
+        stages, variable_count = run_benchmarks(args.participants, args.repeat, args.workers, not args.no_dat)
+    finally:
+        os.chdir(cwd)
+        if args.directory is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    report = {}
+    report["config"] = {"participants": args.participants, "samples": args.samples, "repeat": args.repeat, "seed": args.seed, "workers": args.workers, "variables": variable_count}
+    report["environment"] = {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__, "platform": platform.platform(), "cpus": os.cpu_count()}
+    report["generation_time"] = generation_time
+    report["stages"] = stages
+
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if len(regressions) > 0:
+            print("Regressions: " + ", ".join(regressions))
+            sys.exit(1)
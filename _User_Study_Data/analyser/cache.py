@@ -0,0 +1,105 @@
+import os
+import glob
+import hashlib
+import numpy as np
+
+# On-disk cache of arrays derived from the study's data files (parsed trajectories, room labels, ...).
+# Each array is saved as its own ".npy" file so it can be memory-mapped back in. Entries are keyed by
+# the source file's path, size and modification time, so editing or replacing a data file invalidates
+# its entries, and the least recently used entries are deleted once the cache grows past its size cap.
+# get_file_signature is also how the metrics store and the visit indexes tell that a data file changed.
+
+class ArrayCache:
+    def __init__(self, directory = "_Cache", max_bytes = 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def get_key(self, filename, key_parts):
+        signature = get_file_signature(filename)
+        if signature is None:
+            raise FileNotFoundError(filename)
+
+        key = repr((os.path.abspath(filename),) + tuple(signature) + tuple(key_parts))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    def get_path(self, filename, kind, key):
+        return os.path.join(self.directory, os.path.basename(filename) + "." + kind + "." + key + ".npy")
+
+    def get_array(self, filename, kind, compute, *key_parts):
+        # Cached array of the given kind for the file, or the result of compute() which is then cached
+        path = self.get_path(filename, kind, self.get_key(filename, key_parts))
+
+        if os.path.exists(path):
+            try:
+                array = np.load(path, mmap_mode="r")
+                os.utime(path)
+                return array
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable cache file '{path}': {str(e)}")
+
+        array = compute()
+        self.save_array(path, array)
+        self.invalidate(filename, kind, keep=path)
+
+        return array
+
+    def save_array(self, path, array):
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Written under a temporary name first, so other processes never load a partial file
+        temporary_path = path + "." + str(os.getpid()) + ".tmp"
+        with open(temporary_path, "wb") as file:
+            np.save(file, np.ascontiguousarray(array))
+        os.replace(temporary_path, path)
+
+    def get_entries(self, filename = None, kind = None):
+        pattern = (os.path.basename(filename) if filename is not None else "*") + "." + (kind if kind is not None else "*") + ".*.npy"
+        return glob.glob(os.path.join(glob.escape(self.directory), pattern))
+
+    def invalidate(self, filename = None, kind = None, keep = None):
+        # Deletes the cached entries of a file (all files if None), except for keep
+        for path in self.get_entries(filename, kind):
+            if path != keep:
+                remove_file(path)
+
+    def clear(self):
+        self.invalidate()
+
+    def enforce_size_cap(self):
+        entries = []
+        for path in self.get_entries():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+
+            remove_file(path)
+            total_bytes -= size
+
+def get_file_signature(filename, hash_contents = False):
+    # [size, modification time] of the file, or [size, hash of its contents], or None if it's missing
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+
+    if not hash_contents:
+        return [stat.st_size, stat.st_mtime_ns]
+
+    digest = hashlib.sha1()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return [stat.st_size, digest.hexdigest()]
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
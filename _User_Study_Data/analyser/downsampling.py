@@ -0,0 +1,158 @@
+import json
+import numpy as np
+from .quaternions import angles, slerp
+
+# Reduced representations of trajectories, so path metrics of long sessions don't cost one step per headset frame.
+# Trajectories can be resampled at a fixed rate, interpolating positions linearly and rotations spherically, and/or
+# simplified to the fewest samples that reproduce every original sample within a position and angle tolerance.
+# Samples are never interpolated between different rooms (e.g. across a portal). Simplification also keeps the samples
+# on both sides of every room change, so room visits and per-room times stay the same as at full resolution, while
+# resampling can miss visits shorter than its sampling interval.
+
+###########################################################################
+
+#region Interpolation
+
+def lerp(v0s, v1s, fractions):
+    return v0s + (v1s - v0s) * fractions[:, None]
+
+def interpolate_poses(trajectory, starts, ends, times):
+    # Positions and rotations at the given times, between the samples at the starts and ends indices
+    start_times = trajectory[starts, 0]
+    durations = trajectory[ends, 0] - start_times
+    fractions = np.where(durations > 0, (times - start_times) / np.where(durations > 0, durations, 1), 0)
+
+    positions = lerp(trajectory[starts, 1:4], trajectory[ends, 1:4], fractions)
+    rotations = slerp(trajectory[starts, 4:8], trajectory[ends, 4:8], fractions)
+
+    return positions, rotations
+
+def interpolate_trajectory(trajectory, starts, ends, times):
+    positions, rotations = interpolate_poses(trajectory, starts, ends, times)
+    return np.column_stack((times, positions, rotations))
+
+#endregion
+
+###########################################################################
+
+#region Downsampling
+
+def resample_trajectory(trajectory, labels, rate):
+    # Samples every 1 / rate seconds from the first sample's time, plus the last sample
+    if len(trajectory) < 2:
+        return trajectory, labels
+
+    times = np.arange(trajectory[0, 0], trajectory[-1, 0], 1 / rate)
+    if len(times) == 0 or times[-1] < trajectory[-1, 0]:
+        times = np.append(times, trajectory[-1, 0])
+
+    starts = np.searchsorted(trajectory[:, 0], times, side="right") - 1
+    ends = np.minimum(starts + 1, len(trajectory) - 1)
+
+    # Across a room change the earlier sample is held rather than interpolated through the walls
+    ends = np.where(labels[starts] == labels[ends], ends, starts)
+
+    return interpolate_trajectory(trajectory, starts, ends, times), labels[starts]
+
+def simplify_trajectory(trajectory, labels, tolerance = None, angle_tolerance = None):
+    # Keeps the fewest samples (found by splitting at the worst sample, as in Ramer-Douglas-Peucker) such that
+    # interpolating between the kept samples reproduces every sample within tolerance (metres) and angle_tolerance (degrees).
+    # Every segment is split in the same pass, so each pass is a few array operations over the segments still out of tolerance.
+    sample_count = len(trajectory)
+    if sample_count < 3:
+        return trajectory, labels
+
+    tolerance = tolerance if tolerance is not None else np.inf
+    angle_tolerance = angle_tolerance if angle_tolerance is not None else np.inf
+
+    keep = np.zeros(sample_count, dtype=bool)
+    keep[[0, -1]] = True
+    room_changes = np.flatnonzero(labels[1:] != labels[:-1])
+    keep[room_changes] = True
+    keep[room_changes + 1] = True
+
+    # Samples between kept samples, in segments that haven't been found to be within tolerance yet
+    pending = np.flatnonzero(~keep)
+    while len(pending) > 0:
+        kept = np.flatnonzero(keep)
+        segments = np.searchsorted(kept, pending, side="right") - 1
+
+        samples = trajectory[pending]
+        positions, rotations = interpolate_poses(trajectory, kept[segments], kept[segments + 1], samples[:, 0])
+        position_errors = np.linalg.norm(samples[:, 1:4] - positions, axis=1)
+        rotation_errors = angles(samples[:, 4:8], rotations)
+        errors = np.maximum(position_errors / tolerance, rotation_errors / angle_tolerance)
+
+        # pending is sorted, so each segment's samples are contiguous
+        segment_starts = np.flatnonzero(np.concatenate(([True], segments[1:] != segments[:-1])))
+        segment_errors = np.repeat(np.maximum.reduceat(errors, segment_starts), np.diff(np.append(segment_starts, len(pending))))
+
+        split = segment_errors > 1
+        if not np.any(split):
+            break
+
+        # The worst sample of each segment with any samples out of tolerance is kept, splitting the segment in two
+        keep[pending[split & (errors == segment_errors)]] = True
+        pending = pending[split & ~keep[pending]]
+
+    return trajectory[keep], labels[keep]
+
+class Downsampler:
+    # Reduces trajectories with the given resampling rate (Hz) and/or simplification tolerances, before path metrics
+    def __init__(self, rate = None, tolerance = None, angle_tolerance = None, report_drift = False):
+        self.rate = rate
+        self.tolerance = tolerance
+        self.angle_tolerance = angle_tolerance
+        self.report_drift = report_drift
+
+    def get_settings(self):
+        # Settings the reduced trajectories depend on
+        return [self.rate, self.tolerance, self.angle_tolerance]
+
+    def reduce(self, trajectory, labels):
+        if self.rate is not None:
+            trajectory, labels = resample_trajectory(trajectory, labels, self.rate)
+        if self.tolerance is not None or self.angle_tolerance is not None:
+            trajectory, labels = simplify_trajectory(trajectory, labels, self.tolerance, self.angle_tolerance)
+
+        return trajectory, labels
+
+#endregion
+
+###########################################################################
+
+#region Drift
+
+def get_path_drift(full_path_info, path_info, full_sample_count, sample_count):
+    # How far the reduced trajectory's path metrics are from the full resolution ones
+    drift = {}
+    drift["samples"] = full_sample_count
+    drift["reduced_samples"] = sample_count
+    for name in ["total_time", "total_room_visits", "distance_per_time", "turn_per_time"]:
+        full_value = full_path_info[name]
+        value = path_info[name]
+
+        drift[name] = {}
+        drift[name]["full"] = full_value
+        drift[name]["reduced"] = value
+        drift[name]["relative_drift"] = (value - full_value) / full_value if full_value != 0 else 0
+
+    return drift
+
+def write_drift_report(user_infos, filename):
+    # Per-participant drift, and the largest and mean absolute relative drift of each metric over the cohort
+    drifts = {str(id): user_info.data["drift"] for id, user_info in user_infos.items() if "drift" in user_info.data}
+
+    summary = {}
+    summary["samples"] = sum(drift["samples"] for drift in drifts.values())
+    summary["reduced_samples"] = sum(drift["reduced_samples"] for drift in drifts.values())
+    for name in ["total_time", "total_room_visits", "distance_per_time", "turn_per_time"]:
+        relative_drifts = np.abs([drift[name]["relative_drift"] for drift in drifts.values()])
+        summary[name] = {}
+        summary[name]["max_abs_relative_drift"] = float(relative_drifts.max()) if len(relative_drifts) > 0 else 0
+        summary[name]["mean_abs_relative_drift"] = float(relative_drifts.mean()) if len(relative_drifts) > 0 else 0
+
+    with open(filename, "w") as file:
+        json.dump({"summary": summary, "participants": drifts}, file, indent=4)
+
+#endregion
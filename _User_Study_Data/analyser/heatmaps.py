@@ -0,0 +1,122 @@
+import os
+import json
+import numpy as np
+from .rooms import get_room_index
+from .users import read_participant_data
+from .workers import map_in_workers
+from .profiling import profiled
+
+# Occupancy heatmaps: how long participants of each condition spent at each point of the museum.
+# Every sample is weighted by its dwell time (the time until the next sample) and binned into a fine grid over the
+# room layout, with one weighted bincount per recording. The grids of each condition are summed into memory-mapped
+# ".npy" files, so any number of participants fit, and are only rendered once all participants have been added.
+
+###########################################################################
+
+#region Occupancy
+
+class OccupancyGrid:
+    # Square cells of cell_size metres covering every room's bounds, in the control condition's coordinates
+    def __init__(self, rooms_info, cell_size = 0.1):
+        self.rooms_info = rooms_info
+        self.cell_size = cell_size
+
+        grid_xs = [room[0] for room in rooms_info.values()]
+        grid_zs = [room[1] for room in rooms_info.values()]
+        self.min_x = min(grid_xs, default=0) * 3 - 3/2
+        self.max_x = max(grid_xs, default=0) * 3 + 3/2
+        self.min_z = min(grid_zs, default=0) * 6 - 6/2
+        self.max_z = max(grid_zs, default=0) * 6 + 6/2
+
+        self.shape = (int(np.ceil((self.max_x - self.min_x) / cell_size)), int(np.ceil((self.max_z - self.min_z) / cell_size)))
+
+    def get_extent(self):
+        return [self.min_x, self.min_x + self.shape[0] * self.cell_size, self.min_z, self.min_z + self.shape[1] * self.cell_size]
+
+    def accumulate(self, trajectory, labels, portals):
+        # Seconds spent in each cell, as a flat array over the grid
+        if len(trajectory) == 0:
+            return np.zeros(self.shape[0] * self.shape[1])
+
+        xs, zs, mapped = get_room_index(self.rooms_info, portals).get_control_positions(trajectory[:, 1], trajectory[:, 3], labels)
+        dwell_times = np.append(np.diff(trajectory[:, 0]), 0)
+
+        cells_x = np.floor((xs - self.min_x) / self.cell_size).astype(int)
+        cells_z = np.floor((zs - self.min_z) / self.cell_size).astype(int)
+        inside = mapped & (cells_x >= 0) & (cells_x < self.shape[0]) & (cells_z >= 0) & (cells_z < self.shape[1])
+
+        return np.bincount(cells_x[inside] * self.shape[1] + cells_z[inside], weights=dwell_times[inside], minlength=self.shape[0] * self.shape[1])
+
+def get_participant_occupancy(id, rooms_info, grid, cache = None):
+    trajectory, labels = read_participant_data(id, rooms_info, cache)
+    return len(trajectory) > 0, grid.accumulate(trajectory, labels, (id % 2) == 1)
+
+@profiled("heatmaps")
+def build_heatmaps(count, rooms_info, directory = "_Heatmaps", cell_size = 0.1, workers = 1, cache = None):
+    # Sums the dwell times of participants 0 to count - 1 into "control.npy" and "portals.npy" grids (x, z) in directory
+    os.makedirs(directory, exist_ok=True)
+    grid = OccupancyGrid(rooms_info, cell_size)
+
+    grids = {}
+    participant_counts = {}
+    for condition in ["control", "portals"]:
+        grids[condition] = np.lib.format.open_memmap(os.path.join(directory, condition + ".npy"), mode="w+", dtype=np.float64, shape=grid.shape)
+        grids[condition][:] = 0
+        participant_counts[condition] = 0
+
+    ids = list(range(0, count))
+    results = map_in_workers(get_participant_occupancy, workers, ids, [rooms_info] * count, [grid] * count, [cache] * count)
+    for id, (recorded, occupancy) in zip(ids, results):
+        condition = "portals" if (id % 2) == 1 else "control"
+        grids[condition] += occupancy.reshape(grid.shape)
+        participant_counts[condition] += int(recorded)
+
+    for condition in grids:
+        grids[condition].flush()
+
+    heatmaps_info = {}
+    heatmaps_info["cell_size"] = cell_size
+    heatmaps_info["extent"] = grid.get_extent()
+    heatmaps_info["participants"] = participant_counts
+    with open(os.path.join(directory, "heatmaps.json"), "w") as file:
+        json.dump(heatmaps_info, file, indent=4)
+
+    return grids, heatmaps_info
+
+#endregion
+
+###########################################################################
+
+#region Rendering
+
+@profiled("heatmaps")
+def render_heatmaps(grids, heatmaps_info, rooms_info, filename):
+    # One panel per condition of the mean seconds per participant in each cell, over the rooms' outlines
+    # matplotlib is slow to import and only needed here, so it's imported here
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import PowerNorm
+    from matplotlib.patches import Rectangle
+
+    means = {condition: np.asarray(grid) / max(heatmaps_info["participants"][condition], 1) for condition, grid in grids.items()}
+    vmax = max([mean.max() for mean in means.values()] + [1e-9])
+
+    figure, axes = plt.subplots(1, len(means), figsize=(4 * len(means), 10), sharey=True)
+    for axis, (condition, mean) in zip(np.atleast_1d(axes), means.items()):
+        image = axis.imshow(np.ma.masked_equal(mean.T, 0), origin="lower", extent=heatmaps_info["extent"], cmap="inferno", norm=PowerNorm(0.4, vmin=0, vmax=vmax), interpolation="nearest")
+
+        for room_name, room in rooms_info.items():
+            axis.add_patch(Rectangle((room[0] * 3 - 3/2, room[1] * 6 - 6/2), 3, 6, fill=False, edgecolor="grey", linewidth=0.5))
+            axis.text(room[0] * 3, room[1] * 6, room_name, color="grey", fontsize=6, ha="center", va="center")
+
+        axis.set_title(condition.capitalize() + " (" + str(heatmaps_info["participants"][condition]) + " participants)")
+        axis.set_xlabel("x (m)")
+        axis.set_aspect("equal")
+
+    np.atleast_1d(axes)[0].set_ylabel("z (m)")
+    figure.colorbar(image, ax=axes, label="Mean seconds per participant per cell")
+    figure.savefig(filename, dpi=200)
+    plt.close(figure)
+
+#endregion
@@ -0,0 +1,185 @@
+import io
+import os
+import sys
+import time
+import asyncio
+import contextlib
+import numpy as np
+from .rooms import get_room_index
+from .trajectories import PathAccumulator, parse_trajectory
+
+# Live path metrics of a session as its samples arrive, from lines of "time, x, y, z, qx, qy, qz, qw" samples:
+# - from stdin, or from one connection to a local TCP port, until the stream is closed. These are the only live feeds,
+#   and nothing in the Unity project sends samples to them yet
+# - from the participant's "<id>.txt" file, which SaveAndLoad.Save writes whole at the end of the session, so it only
+#   gives the final metrics: the file is waited for, then read until no lines have been added for a while
+# Whatever lines have arrived are parsed and added to a PathAccumulator as one block, so the cost per sample stays the
+# same however long the session gets, and the final path info is the one the analysis computes from the whole file.
+
+###########################################################################
+
+#region Sources
+
+def split_lines(pending, data):
+    # Complete lines of pending + data, and the incomplete last line left over
+    text = pending + data
+    end = text.rfind("\n") + 1
+
+    return text[:end], text[end:]
+
+async def tail_file_lines(filename, poll_interval = 0.1, idle_timeout = 10, wait_timeout = None):
+    # Blocks of complete lines appended to filename, waiting up to wait_timeout seconds (no limit if None) for it to be created
+    wait_start_time = time.monotonic()
+    while not os.path.exists(filename):
+        if wait_timeout is not None and time.monotonic() - wait_start_time > wait_timeout:
+            print(f"File '{filename}' not found.")
+            return
+        await asyncio.sleep(poll_interval)
+
+    last_data_time = time.monotonic()
+    pending = ""
+    with open(filename, 'r') as file:
+        while True:
+            data = file.read()
+            if data == "":
+                if time.monotonic() - last_data_time > idle_timeout:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+
+            last_data_time = time.monotonic()
+            lines, pending = split_lines(pending, data)
+            if lines != "":
+                yield lines
+
+    if pending.strip() != "":
+        yield pending
+
+async def read_stream_lines(read):
+    # Blocks of complete lines from an awaitable read(), until it returns nothing (the stream was closed)
+    pending = ""
+    while True:
+        data = await read()
+        if len(data) == 0:
+            break
+
+        lines, pending = split_lines(pending, data.decode())
+        if lines != "":
+            yield lines
+
+    if pending.strip() != "":
+        yield pending
+
+async def stdin_lines():
+    # Reading stdin blocks, so it's read in a thread
+    async for lines in read_stream_lines(lambda: asyncio.to_thread(sys.stdin.buffer.read1, 65536)):
+        yield lines
+
+async def socket_lines(port):
+    # Lines from the first connection to port on localhost
+    loop = asyncio.get_running_loop()
+    connected = loop.create_future()
+
+    def on_connected(reader, writer):
+        if connected.done():
+            writer.close()
+        else:
+            connected.set_result((reader, writer))
+
+    server = await asyncio.start_server(on_connected, "127.0.0.1", port)
+    async with server:
+        print("Listening on port " + str(port))
+        reader, writer = await connected
+
+        async for lines in read_stream_lines(lambda: reader.read(65536)):
+            yield lines
+        writer.close()
+
+#endregion
+
+###########################################################################
+
+#region Live Metrics
+
+class LiveSession:
+    # Path metrics of one participant's samples so far
+    def __init__(self, id, rooms_info):
+        self.id = id
+        self.portals = (id % 2) == 1
+        self.room_index = get_room_index(rooms_info, self.portals)
+        self.path_accumulator = PathAccumulator(rooms_info, self.portals)
+
+        self.sample_count = 0
+        self.out_of_bounds_count = 0
+        self.room_entered_time = 0
+
+    def add_lines(self, lines):
+        try:
+            trajectory = parse_trajectory(lines)
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+            return
+        if len(trajectory) == 0:
+            return
+
+        labels = self.room_index.locate(trajectory[:, 1], trajectory[:, 3])
+        if self.sample_count == 0:
+            self.room_entered_time = trajectory[0, 0]
+        entered = np.flatnonzero(labels != np.concatenate(([self.path_accumulator.last_label if self.sample_count > 0 else labels[0]], labels[:-1])))
+        if len(entered) > 0:
+            self.room_entered_time = trajectory[entered[-1], 0]
+
+        # Samples outside every room are counted rather than printed one by one
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.path_accumulator.add(trajectory, labels)
+
+        self.sample_count += len(trajectory)
+        self.out_of_bounds_count += int((labels == -1).sum())
+
+    def get_path_info(self):
+        return self.path_accumulator.get_path_info()
+
+    def print_snapshot(self):
+        if self.sample_count == 0:
+            print("Waiting for samples...")
+            return
+
+        path_accumulator = self.path_accumulator
+        current_time = float(path_accumulator.last_sample[0])
+        current_room = path_accumulator.room_names[path_accumulator.last_label]
+
+        print("#")
+        print("Participant " + str(self.id) + " at " + str(round(current_time, 1)) + "s (" + str(self.sample_count) + " samples, " + str(self.out_of_bounds_count) + " out of bounds)")
+        print("Room =", current_room if current_room != "" else "(none)", "for", str(round(current_time - self.room_entered_time, 1)) + "s")
+        print("Room visits =", path_accumulator.room_visits)
+        print("Distance =", str(round(path_accumulator.total_distance, 1)) + "m")
+        print("Turn =", str(round(path_accumulator.total_turn)) + "°")
+        for room_name, room in path_accumulator.visited.items():
+            print("  " + (room_name if room_name != "" else "(none)") + ": " + str(round(room["total_time"], 1)) + "s over " + str(len(room["sequence"])) + " visits")
+
+async def watch_participant(id, rooms_info, lines_source, report_interval = 1):
+    # Adds each block of lines as it arrives, printing the metrics at most every report_interval seconds and once at the end
+    session = LiveSession(id, rooms_info)
+
+    last_report_time = time.monotonic()
+    async for lines in lines_source:
+        session.add_lines(lines)
+
+        if time.monotonic() - last_report_time >= report_interval:
+            session.print_snapshot()
+            last_report_time = time.monotonic()
+
+    session.print_snapshot()
+    return session
+
+def run_live(id, rooms_info, use_stdin = False, port = None, report_interval = 1, idle_timeout = 10, wait_timeout = None, poll_interval = 0.1):
+    if use_stdin:
+        lines_source = stdin_lines()
+    elif port is not None:
+        lines_source = socket_lines(port)
+    else:
+        lines_source = tail_file_lines(str(id) + '.txt', poll_interval, idle_timeout, wait_timeout)
+
+    return asyncio.run(watch_participant(id, rooms_info, lines_source, report_interval))
+
+#endregion
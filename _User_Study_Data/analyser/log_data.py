@@ -0,0 +1,494 @@
+import struct
+import numpy as np
+
+# Reads the ".dat" save files written by SaveAndLoad.Save in the Unity project.
+# These are .NET BinaryFormatter dumps of the LogData class, which use the record layout of the
+# .NET Remoting Binary Format (MS-NRBF). Only the records BinaryFormatter writes for plain
+# serializable classes, strings, lists and arrays are supported.
+
+###########################################################################
+
+#region Record Types
+
+SERIALIZED_STREAM_HEADER = 0
+CLASS_WITH_ID = 1
+SYSTEM_CLASS_WITH_MEMBERS = 2
+CLASS_WITH_MEMBERS = 3
+SYSTEM_CLASS_WITH_MEMBERS_AND_TYPES = 4
+CLASS_WITH_MEMBERS_AND_TYPES = 5
+BINARY_OBJECT_STRING = 6
+BINARY_ARRAY = 7
+MEMBER_PRIMITIVE_TYPED = 8
+MEMBER_REFERENCE = 9
+OBJECT_NULL = 10
+MESSAGE_END = 11
+BINARY_LIBRARY = 12
+OBJECT_NULL_MULTIPLE_256 = 13
+OBJECT_NULL_MULTIPLE = 14
+ARRAY_SINGLE_PRIMITIVE = 15
+ARRAY_SINGLE_OBJECT = 16
+ARRAY_SINGLE_STRING = 17
+
+# Member types (BinaryTypeEnum)
+PRIMITIVE = 0
+STRING = 1
+OBJECT = 2
+SYSTEM_CLASS = 3
+CLASS = 4
+OBJECT_ARRAY = 5
+STRING_ARRAY = 6
+PRIMITIVE_ARRAY = 7
+
+# Fixed size primitive types (PrimitiveTypeEnum), Char (3), Decimal (5) and String (18) are read separately
+PRIMITIVE_DTYPES = {
+    1: np.dtype("<?"),      # Boolean
+    2: np.dtype("<u1"),     # Byte
+    6: np.dtype("<f8"),     # Double
+    7: np.dtype("<i2"),     # Int16
+    8: np.dtype("<i4"),     # Int32
+    9: np.dtype("<i8"),     # Int64
+    10: np.dtype("<i1"),    # SByte
+    11: np.dtype("<f4"),    # Single
+    12: np.dtype("<i8"),    # TimeSpan
+    13: np.dtype("<u8"),    # DateTime
+    14: np.dtype("<u2"),    # UInt16
+    15: np.dtype("<u4"),    # UInt32
+    16: np.dtype("<u8"),    # UInt64
+}
+
+CHAR = 3
+DECIMAL = 5
+SINGLE = 11
+PRIMITIVE_STRING = 18
+
+# Object ID used in place of null members and array elements
+NULL_ID = 0
+
+#endregion
+
+###########################################################################
+
+#region Reader
+
+class NullRun:
+    def __init__(self, count):
+        self.count = count
+
+class NRBFReader:
+    # Class instances are kept column-wise per class name, and primitive arrays per (type, length),
+    # so that the many small records of a LogData dump can be read in whole runs with numpy
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+        self.root_id = NULL_ID
+        self.class_infos = {}
+        self.objects = {}
+        self.instances = {}
+        self.instance_classes = {}
+        self.primitive_arrays = {}
+
+    #region Primitive Values
+
+    def read(self, format):
+        values = struct.unpack_from(format, self.data, self.position)
+        self.position += struct.calcsize(format)
+        return values if len(values) > 1 else values[0]
+
+    def skip(self, format):
+        # Moves past fields that aren't needed, without unpacking them
+        self.position += struct.calcsize(format)
+
+    def read_string(self):
+        length = 0
+        shift = 0
+        while True:
+            byte = self.read("<B")
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if byte & 0x80 == 0:
+                break
+
+        value = bytes(self.data[self.position:self.position + length]).decode("utf-8")
+        self.position += length
+        return value
+
+    def read_primitive(self, primitive_type):
+        if primitive_type == CHAR:
+            first_byte = self.data[self.position]
+            length = 1 if first_byte < 0x80 else 2 if first_byte < 0xE0 else 3 if first_byte < 0xF0 else 4
+            value = bytes(self.data[self.position:self.position + length]).decode("utf-8")
+            self.position += length
+            return value
+        if primitive_type == DECIMAL or primitive_type == PRIMITIVE_STRING:
+            return self.read_string()
+        if primitive_type not in PRIMITIVE_DTYPES:
+            raise ValueError("Unsupported primitive type " + str(primitive_type))
+
+        dtype = PRIMITIVE_DTYPES[primitive_type]
+        value = np.frombuffer(self.data, dtype, count=1, offset=self.position)[0]
+        self.position += dtype.itemsize
+        return value.item()
+
+    def read_primitives(self, primitive_type, count):
+        if primitive_type not in PRIMITIVE_DTYPES:
+            return np.array([self.read_primitive(primitive_type) for i in range(count)], dtype=object)
+
+        dtype = PRIMITIVE_DTYPES[primitive_type]
+        values = np.frombuffer(self.data, dtype, count=count, offset=self.position)
+        self.position += count * dtype.itemsize
+        return values
+
+    #endregion
+
+    #region Runs
+
+    def read_run(self, dtype, is_valid, limit = None):
+        # Longest run of back to back records matching dtype, checked in doubling blocks
+        available = (len(self.data) - self.position) // dtype.itemsize
+        if limit is not None:
+            available = min(available, limit)
+
+        count = 0
+        block = 64
+        while count < available:
+            size = min(block, available - count)
+            records = np.frombuffer(self.data, dtype, count=size, offset=self.position + count * dtype.itemsize)
+            valid = is_valid(records)
+            if not valid.all():
+                count += int(np.argmin(valid))
+                break
+
+            count += size
+            block *= 2
+
+        run = np.frombuffer(self.data, dtype, count=count, offset=self.position)
+        self.position += count * dtype.itemsize
+        return run
+
+    def read_class_run(self, metadata_id):
+        class_name, member_names, member_types = self.class_infos[metadata_id]
+
+        fields = [("record", "<u1"), ("id", "<i4"), ("metadata_id", "<i4")]
+        references = []
+        for i, (binary_type, additional_info) in enumerate(member_types):
+            if binary_type == PRIMITIVE:
+                if additional_info not in PRIMITIVE_DTYPES:
+                    return 0
+                fields.append(("member" + str(i), PRIMITIVE_DTYPES[additional_info]))
+            else:
+                # Members of the run are expected to be references to objects written elsewhere
+                fields.append(("record" + str(i), "<u1"))
+                fields.append(("member" + str(i), "<i4"))
+                references.append("record" + str(i))
+
+        def is_valid(records):
+            valid = (records["record"] == CLASS_WITH_ID) & (records["metadata_id"] == metadata_id)
+            for reference in references:
+                valid &= records[reference] == MEMBER_REFERENCE
+            return valid
+
+        run = self.read_run(np.dtype(fields), is_valid)
+        if len(run) > 0:
+            chunk = {"id": run["id"]}
+            for i, member_name in enumerate(member_names):
+                chunk[member_name] = run["member" + str(i)]
+            self.add_instances(class_name, chunk)
+
+        return len(run)
+
+    def read_primitive_array_run(self):
+        # Arrays of the same object (e.g. a position and rotation) are written one after the other,
+        # so look for a repeating pattern of up to 4 array shapes
+        headers = []
+        offset = self.position
+        while len(headers) < 4 and offset + 10 <= len(self.data) and self.data[offset] == ARRAY_SINGLE_PRIMITIVE:
+            length, primitive_type = struct.unpack_from("<iB", self.data, offset + 5)
+            if primitive_type not in PRIMITIVE_DTYPES or length < 0:
+                break
+            headers.append((length, primitive_type))
+            offset += 10 + length * PRIMITIVE_DTYPES[primitive_type].itemsize
+
+        for period in range(1, len(headers) + 1):
+            fields = []
+            for i, (length, primitive_type) in enumerate(headers[:period]):
+                fields += [("record" + str(i), "<u1"), ("id" + str(i), "<i4"), ("length" + str(i), "<i4"), ("type" + str(i), "<u1")]
+                fields.append(("values" + str(i), PRIMITIVE_DTYPES[primitive_type], (length,)))
+
+            def is_valid(records):
+                valid = np.ones(len(records), dtype=bool)
+                for i, (length, primitive_type) in enumerate(headers[:period]):
+                    valid &= records["record" + str(i)] == ARRAY_SINGLE_PRIMITIVE
+                    valid &= records["length" + str(i)] == length
+                    valid &= records["type" + str(i)] == primitive_type
+                return valid
+
+            start = self.position
+            run = self.read_run(np.dtype(fields), is_valid)
+            if len(run) < 2 and period < len(headers):
+                self.position = start
+                continue
+
+            for i, (length, primitive_type) in enumerate(headers[:period]):
+                self.add_primitive_arrays(primitive_type, length, run["id" + str(i)], run["values" + str(i)].reshape(len(run), length))
+
+            return len(run)
+
+        return 0
+
+    #endregion
+
+    #region Objects
+
+    def add_instances(self, class_name, chunk):
+        if class_name not in self.instances:
+            self.instances[class_name] = []
+        self.instances[class_name].append(chunk)
+
+    def add_primitive_arrays(self, primitive_type, length, ids, values):
+        key = (primitive_type, length)
+        if key not in self.primitive_arrays:
+            self.primitive_arrays[key] = []
+        self.primitive_arrays[key].append((ids, values))
+
+    def read_member_type_info(self, member_count):
+        binary_types = [self.read("<B") for i in range(member_count)]
+
+        member_types = []
+        for binary_type in binary_types:
+            additional_info = None
+            if binary_type == PRIMITIVE or binary_type == PRIMITIVE_ARRAY:
+                additional_info = self.read("<B")
+            elif binary_type == SYSTEM_CLASS:
+                additional_info = self.read_string()
+            elif binary_type == CLASS:
+                additional_info = (self.read_string(), self.read("<i"))
+            member_types.append((binary_type, additional_info))
+
+        return member_types
+
+    def read_class(self, record_type):
+        object_id = self.read("<i")
+        class_name = self.read_string()
+        member_count = self.read("<i")
+        member_names = [self.read_string() for i in range(member_count)]
+
+        if record_type in (SYSTEM_CLASS_WITH_MEMBERS_AND_TYPES, CLASS_WITH_MEMBERS_AND_TYPES):
+            member_types = self.read_member_type_info(member_count)
+        else:
+            member_types = [(OBJECT, None)] * member_count
+
+        if record_type in (CLASS_WITH_MEMBERS, CLASS_WITH_MEMBERS_AND_TYPES):
+            # Library ID
+            self.skip("<i")
+
+        self.class_infos[object_id] = (class_name, member_names, member_types)
+        self.read_class_members(object_id, object_id)
+
+    def read_class_members(self, object_id, metadata_id):
+        class_name, member_names, member_types = self.class_infos[metadata_id]
+
+        chunk = {"id": np.array([object_id])}
+        for member_name, (binary_type, additional_info) in zip(member_names, member_types):
+            if binary_type == PRIMITIVE:
+                value = self.read_primitive(additional_info)
+            else:
+                value = self.read_value()
+            chunk[member_name] = np.array([value], dtype=object if isinstance(value, str) else None)
+
+        self.add_instances(class_name, chunk)
+        self.instance_classes[object_id] = class_name
+
+    def read_elements(self, count, primitive_type = None):
+        if primitive_type is not None:
+            return self.read_primitives(primitive_type, count)
+
+        ids = []
+        remaining = count
+        while remaining > 0:
+            if self.data[self.position] == MEMBER_REFERENCE:
+                run = self.read_run(np.dtype([("record", "<u1"), ("id", "<i4")]), lambda records: records["record"] == MEMBER_REFERENCE, remaining)
+                ids.append(run["id"])
+                remaining -= len(run)
+                continue
+
+            value = self.read_value()
+            if isinstance(value, NullRun):
+                ids.append(np.full(min(value.count, remaining), NULL_ID))
+            else:
+                ids.append(np.array([value]))
+            remaining -= len(ids[-1])
+
+        return np.concatenate(ids) if len(ids) > 0 else np.array([], dtype=int)
+
+    def read_binary_array(self):
+        object_id = self.read("<i")
+        array_type = self.read("<B")
+        rank = self.read("<i")
+        lengths = [self.read("<i") for i in range(rank)]
+        if array_type in (3, 4, 5):
+            # Lower bounds
+            self.skip("<" + "i" * rank)
+
+        binary_type, additional_info = self.read_member_type_info(1)[0]
+        count = int(np.prod(lengths))
+
+        if binary_type == PRIMITIVE:
+            values = self.read_elements(count, additional_info)
+            if rank == 1:
+                self.add_primitive_arrays(additional_info, count, np.array([object_id]), values.reshape(1, count))
+            else:
+                self.objects[object_id] = values.reshape(lengths)
+        else:
+            self.objects[object_id] = self.read_elements(count).reshape(lengths)
+
+    def read_value(self):
+        # Reads one record, returning an object ID for objects, a NullRun for repeated nulls, or a primitive value
+        record_type = self.read("<B")
+
+        if record_type == MEMBER_REFERENCE:
+            return self.read("<i")
+        if record_type == OBJECT_NULL:
+            return NULL_ID
+        if record_type == OBJECT_NULL_MULTIPLE_256:
+            return NullRun(self.read("<B"))
+        if record_type == OBJECT_NULL_MULTIPLE:
+            return NullRun(self.read("<i"))
+        if record_type == MEMBER_PRIMITIVE_TYPED:
+            return self.read_primitive(self.read("<B"))
+
+        start = self.position - 1
+        if record_type == BINARY_LIBRARY:
+            # Library ID and name
+            self.skip("<i")
+            self.read_string()
+            return self.read_value()
+        if record_type == CLASS_WITH_ID:
+            object_id, metadata_id = self.read("<ii")
+
+            self.position = start
+            if self.read_class_run(metadata_id) == 0:
+                self.position = start + 9
+                self.read_class_members(object_id, metadata_id)
+            return object_id
+        if record_type in (SYSTEM_CLASS_WITH_MEMBERS, CLASS_WITH_MEMBERS, SYSTEM_CLASS_WITH_MEMBERS_AND_TYPES, CLASS_WITH_MEMBERS_AND_TYPES):
+            object_id = struct.unpack_from("<i", self.data, self.position)[0]
+            self.read_class(record_type)
+            return object_id
+        if record_type == BINARY_OBJECT_STRING:
+            object_id = self.read("<i")
+            self.objects[object_id] = self.read_string()
+            return object_id
+        if record_type == BINARY_ARRAY:
+            object_id = struct.unpack_from("<i", self.data, self.position)[0]
+            self.read_binary_array()
+            return object_id
+        if record_type == ARRAY_SINGLE_PRIMITIVE:
+            object_id = self.read("<i")
+
+            self.position = start
+            if self.read_primitive_array_run() == 0:
+                self.position = start + 5
+                length, primitive_type = self.read("<iB")
+                values = self.read_elements(length, primitive_type)
+                self.add_primitive_arrays(primitive_type, length, np.array([object_id]), values.reshape(1, length))
+            return object_id
+        if record_type in (ARRAY_SINGLE_OBJECT, ARRAY_SINGLE_STRING):
+            object_id, length = self.read("<ii")
+            self.objects[object_id] = self.read_elements(length)
+            return object_id
+
+        raise ValueError("Unsupported record type " + str(record_type) + " at byte " + str(start))
+
+    def read_stream(self):
+        if self.read("<B") != SERIALIZED_STREAM_HEADER:
+            raise ValueError("Not a BinaryFormatter stream")
+
+        self.root_id, header_id, major_version, minor_version = self.read("<iiii")
+
+        while self.position < len(self.data):
+            if self.data[self.position] == MESSAGE_END:
+                return
+
+            self.read_value()
+
+        raise ValueError("Stream ended before the message end record")
+
+    #endregion
+
+    #region Lookups
+
+    def get_instances(self, class_name, ids):
+        # Members of the given instances, in the order of ids
+        chunks = self.instances.get(class_name, [])
+        columns = {}
+        for member_name in (chunks[0].keys() if len(chunks) > 0 else ["id"]):
+            columns[member_name] = np.concatenate([chunk[member_name] for chunk in chunks]) if len(chunks) > 0 else np.array([], dtype=int)
+
+        rows = find_rows(columns["id"], ids, class_name)
+        return {member_name: column[rows] for member_name, column in columns.items()}
+
+    def get_instance(self, object_id):
+        if object_id not in self.instance_classes:
+            raise ValueError("No object with ID " + str(object_id))
+
+        members = self.get_instances(self.instance_classes[object_id], np.array([object_id]))
+        return {member_name: column[0] for member_name, column in members.items()}
+
+    def get_primitive_arrays(self, ids, primitive_type, length):
+        # Values of the given single dimension arrays as rows, in the order of ids
+        chunks = self.primitive_arrays.get((primitive_type, length), [])
+        if len(chunks) == 0:
+            chunks = [(np.array([], dtype=int), np.empty((0, length), dtype=PRIMITIVE_DTYPES.get(primitive_type)))]
+
+        array_ids = np.concatenate([chunk[0] for chunk in chunks])
+        values = np.concatenate([chunk[1] for chunk in chunks])
+
+        return values[find_rows(array_ids, ids, "array of length " + str(length))]
+
+    #endregion
+
+def find_rows(all_ids, ids, description):
+    if len(all_ids) == 0:
+        if len(ids) > 0:
+            raise ValueError("Missing " + description + " objects referenced by the stream")
+        return np.array([], dtype=int)
+
+    order = np.argsort(all_ids, kind="stable")
+    positions = np.minimum(np.searchsorted(all_ids, ids, sorter=order), len(order) - 1)
+    rows = order[positions]
+
+    if np.any(all_ids[rows] != ids):
+        raise ValueError("Missing " + description + " objects referenced by the stream")
+
+    return rows
+
+#endregion
+
+###########################################################################
+
+#region LogData
+
+def parse_log_data(data):
+    # Same (N, 8) trajectory layout as the ".txt" files: time, position x, y, z, rotation x, y, z, w
+    reader = NRBFReader(data)
+    reader.read_stream()
+
+    log_data = reader.get_instance(reader.root_id)
+    motion_list = reader.get_instance(log_data["_motionInfos"])
+    item_ids = reader.objects[motion_list["_items"]][:motion_list["_size"]]
+    if len(item_ids) == 0:
+        return np.empty((0, 8))
+
+    motion_infos = reader.get_instances("LogData+MotionInfo", item_ids)
+    times = motion_infos["_time"].astype(np.float64)
+    positions = reader.get_primitive_arrays(motion_infos["_position"], SINGLE, 3).astype(np.float64)
+    rotations = reader.get_primitive_arrays(motion_infos["_rotation"], SINGLE, 4).astype(np.float64)
+
+    return np.column_stack((times, positions, rotations))
+
+def load_log_data(filename):
+    with open(filename, 'rb') as file:
+        return parse_log_data(file.read())
+
+#endregion
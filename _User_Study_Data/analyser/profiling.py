@@ -0,0 +1,162 @@
+import json
+import time
+import pstats
+import cProfile
+import functools
+import contextlib
+import tracemalloc
+
+# Optional instrumentation of the analysis. Stages are timed with profiler.stage(...) or the @profiled(...) decorator,
+# and counters (samples parsed, room lookups, tests run, ...) are added with profiler.count(...). Both are recorded
+# against the participant being processed, if any. When the profiler is stopped (the default) they cost one check.
+# Stage times include the time of stages nested inside them. Memory peaks are only traced in trace_memory mode, as
+# tracemalloc slows everything down, and cProfile call statistics are only gathered in this process.
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.call_profile = None
+        self.participant = None
+        self.reset()
+
+    def reset(self):
+        # participant (None for the whole cohort) -> stage -> [calls, time, peak memory]
+        self.timings = {}
+        # participant (None for the whole cohort) -> counter -> count
+        self.counters = {}
+        # Open stages' [start memory, peak memory so far] while tracing memory
+        self.memory_frames = []
+
+    def start(self, trace_memory = False, profile_calls = False):
+        self.enabled = True
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if profile_calls:
+            self.call_profile = cProfile.Profile()
+            self.call_profile.enable()
+
+    def stop(self):
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if self.call_profile is not None:
+            self.call_profile.disable()
+
+    @contextlib.contextmanager
+    def for_participant(self, id):
+        last_participant = self.participant
+        self.participant = id
+        try:
+            yield
+        finally:
+            self.participant = last_participant
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        if self.trace_memory:
+            # The peak is reset for each stage, so it's first handed on to the stages it's nested in
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            for frame in self.memory_frames:
+                frame[1] = max(frame[1], peak_memory)
+            tracemalloc.reset_peak()
+            self.memory_frames.append([current_memory, current_memory])
+
+        participant = self.participant
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+
+            peak = 0
+            if self.trace_memory and len(self.memory_frames) > 0:
+                frame = self.memory_frames.pop()
+                peak_memory = max(frame[1], tracemalloc.get_traced_memory()[1])
+                for outer_frame in self.memory_frames:
+                    outer_frame[1] = max(outer_frame[1], peak_memory)
+                peak = peak_memory - frame[0]
+
+            timing = self.timings.setdefault(participant, {}).setdefault(name, [0, 0, 0])
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], peak)
+
+    def count(self, name, amount = 1):
+        if not self.enabled:
+            return
+
+        counters = self.counters.setdefault(self.participant, {})
+        counters[name] = counters.get(name, 0) + int(amount)
+
+    def get_records(self):
+        # Picklable copy of the recorded timings and counters, e.g. to hand back from a worker process
+        return {"timings": self.timings, "counters": self.counters}
+
+    def add_records(self, records):
+        for participant, stages in records["timings"].items():
+            for name, (calls, elapsed, peak) in stages.items():
+                timing = self.timings.setdefault(participant, {}).setdefault(name, [0, 0, 0])
+                timing[0] += calls
+                timing[1] += elapsed
+                timing[2] = max(timing[2], peak)
+
+        for participant, counters in records["counters"].items():
+            for name, amount in counters.items():
+                participant_counters = self.counters.setdefault(participant, {})
+                participant_counters[name] = participant_counters.get(name, 0) + amount
+
+    def get_report(self):
+        def get_stages(stages):
+            return {name: {"calls": calls, "time": elapsed, "peak_memory": peak if self.trace_memory else None} for name, (calls, elapsed, peak) in sorted(stages.items())}
+
+        participants = sorted(set(self.timings.keys()) | set(self.counters.keys()), key=lambda participant: (participant is not None, participant))
+
+        report = {}
+        report["trace_memory"] = self.trace_memory
+        report["cohort"] = {"stages": get_stages(self.timings.get(None, {})), "counters": dict(sorted(self.counters.get(None, {}).items()))}
+        report["participants"] = {}
+        for participant in participants:
+            if participant is None:
+                continue
+            report["participants"][str(participant)] = {"stages": get_stages(self.timings.get(participant, {})), "counters": dict(sorted(self.counters.get(participant, {}).items()))}
+
+        # Totals over the cohort and every participant
+        totals = Profiler()
+        totals.trace_memory = self.trace_memory
+        for participant in participants:
+            totals.add_records({"timings": {None: self.timings.get(participant, {})}, "counters": {None: self.counters.get(participant, {})}})
+        report["totals"] = {"stages": get_stages(totals.timings.get(None, {})), "counters": dict(sorted(totals.counters.get(None, {}).items()))}
+
+        return report
+
+    def write_report(self, filename):
+        with open(filename, "w") as file:
+            json.dump(self.get_report(), file, indent=4)
+
+    def write_call_stats(self, filename):
+        # cProfile statistics, readable with pstats or tools such as snakeviz
+        if self.call_profile is not None:
+            pstats.Stats(self.call_profile).dump_stats(filename)
+
+profiler = Profiler()
+
+def profiled(name):
+    # Decorator timing every call of a function as the given stage
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+
+            with profiler.stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
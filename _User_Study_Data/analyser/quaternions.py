@@ -0,0 +1,69 @@
+import math
+import numpy as np
+
+# Kernels over quaternions stored as x, y, z, w (the order Unity logs them in), either single quaternions or
+# (N, 4) arrays of them, such as the rotation columns of a whole recording in one call.
+# q and -q are the same rotation, so angles are taken from the absolute dot product, as Unity's Quaternion.Angle does.
+
+###########################################################################
+
+#region Angles
+
+def angle(q1, q2, degrees = True):
+
+    # Inspired code from:
+    # https://forum.unity.com/threads/quaternion-angle-implementation.572632/
+
+    dot_product = min(abs(q1[0] * q2[0] + q1[1] * q2[1] + q1[2] * q2[2] + q1[3] * q2[3]), 1)
+
+    angle_radians = math.acos(dot_product) * 2
+
+    return math.degrees(angle_radians) if degrees else angle_radians
+
+def angles(q1s, q2s, degrees = True):
+    # Vectorised angle() between matching rows of two (N, 4) arrays
+    dot_products = np.minimum(np.abs(np.einsum("ij,ij->i", q1s, q2s)), 1)
+
+    angles_radians = np.arccos(dot_products) * 2
+
+    return np.degrees(angles_radians) if degrees else angles_radians
+
+def step_angles(quaternions, degrees = True):
+    # Angles between consecutive rows, (N - 1,) for N rows
+    return angles(quaternions[1:], quaternions[:-1], degrees)
+
+def cumulative_turns(quaternions, degrees = True):
+    # Total turn from the first row up to each row, (N,) for N rows
+    return np.concatenate(([0], np.cumsum(step_angles(quaternions, degrees))))
+
+def angular_velocities(times, quaternions, degrees = True):
+    # Turn per second over each step between consecutive rows, 0 for steps that take no time
+    step_times = np.diff(times)
+    return np.divide(step_angles(quaternions, degrees), step_times, out=np.zeros(len(step_times)), where=step_times > 0)
+
+#endregion
+
+###########################################################################
+
+#region Interpolation
+
+def slerp(q0s, q1s, fractions):
+    # Spherical interpolation between matching rows of two (N, 4) arrays
+    # q1 is flipped where needed to take the shorter way around
+    dot_products = np.einsum("ij,ij->i", q0s, q1s)
+    q1s = np.where(dot_products[:, None] < 0, -q1s, q1s)
+    dot_products = np.minimum(np.abs(dot_products), 1)
+
+    thetas = np.arccos(dot_products)
+    sin_thetas = np.sin(thetas)
+
+    # Nearly identical rotations fall back to normalised linear interpolation
+    close = sin_thetas < 1e-6
+    safe_sin_thetas = np.where(close, 1, sin_thetas)
+    weights0 = np.where(close, 1 - fractions, np.sin((1 - fractions) * thetas) / safe_sin_thetas)
+    weights1 = np.where(close, fractions, np.sin(fractions * thetas) / safe_sin_thetas)
+
+    quaternions = q0s * weights0[:, None] + q1s * weights1[:, None]
+    return quaternions / np.linalg.norm(quaternions, axis=1, keepdims=True)
+
+#endregion
@@ -0,0 +1,120 @@
+import numpy as np
+from .workers import map_in_workers
+
+# Permutation tests and bootstrap confidence intervals between the two conditions, for many variables at once.
+# Each shard of resamples draws its index matrices once and evaluates every variable with matrix products,
+# so the cost is a few BLAS calls per shard rather than a Python loop per resample and variable.
+#
+# values: (participants, variables) array of ordered variables, NaN where a participant has no value
+# codes: (participants, variables) array of category codes (0, 1, ...) of unordered variables, -1 where a participant has no value
+# control: (participants,) boolean array, True for participants in the control condition
+
+###########################################################################
+
+#region Statistics
+
+def get_mean_differences(values, group_weights):
+    # Rows of group_weights are 1 for experimental and 0 for control participants, giving (resamples, variables) differences
+    # Missing values are left out of their variable's means
+    present = ~np.isnan(values)
+    values = np.where(present, values, 0)
+    experimental_count = group_weights @ present
+    control_count = present.sum(axis=0) - experimental_count
+
+    return (group_weights @ values) / experimental_count - ((1 - group_weights) @ values) / control_count
+
+def get_chi2_statistics(codes, group_weights):
+    # Pearson's chi-squared statistic of each variable's category x condition table, for each row of group_weights
+    statistics = np.zeros((group_weights.shape[0], codes.shape[1]))
+    for i in range(codes.shape[1]):
+        # Missing values (-1) are in no category
+        categories = (codes[:, i][:, None] == np.arange(codes[:, i].max() + 1)).astype(float)
+
+        experimental = group_weights @ categories
+        control = categories.sum(axis=0) - experimental
+        observed = np.stack((control, experimental), axis=2)
+
+        totals = categories.sum()
+        expected = categories.sum(axis=0)[None, :, None] * observed.sum(axis=1, keepdims=True) / totals
+
+        statistics[:, i] = (((observed - expected) ** 2) / expected).sum(axis=(1, 2))
+
+    return statistics
+
+#endregion
+
+###########################################################################
+
+#region Resampling
+
+def get_bootstrap_weights(rng, participant_count, resamples):
+    # How many times each participant is drawn in each resample (with replacement)
+    indexes = rng.integers(0, participant_count, size=(resamples, participant_count))
+    offsets = indexes + np.arange(resamples)[:, None] * participant_count
+
+    return np.bincount(offsets.ravel(), minlength=resamples * participant_count).reshape(resamples, participant_count)
+
+def run_shard(values, codes, control, resamples, seed_sequence):
+    rng = np.random.default_rng(seed_sequence)
+    experimental = (~control).astype(float)
+
+    # Permutations shuffle the condition labels of all participants
+    permuted = rng.permuted(np.tile(experimental, (resamples, 1)), axis=1)
+
+    observed_differences = np.abs(get_mean_differences(values, experimental[None, :]))[0]
+    permuted_differences = np.abs(get_mean_differences(values, permuted))
+
+    observed_statistics = get_chi2_statistics(codes, experimental[None, :])[0]
+    permuted_statistics = get_chi2_statistics(codes, permuted)
+
+    # Small tolerance so that ties with the observed statistic aren't lost to rounding
+    ordered_exceed = np.count_nonzero(permuted_differences >= observed_differences * (1 - 1e-12), axis=0)
+    unordered_exceed = np.count_nonzero(permuted_statistics >= observed_statistics * (1 - 1e-12), axis=0)
+
+    # Bootstraps resample participants within each condition, out of those with values, so variables missing the
+    # same participants share their draws
+    present = ~np.isnan(values)
+    patterns, pattern_indexes = np.unique(present, axis=1, return_inverse=True)
+    differences = np.empty((resamples, values.shape[1]))
+    for pattern in range(patterns.shape[1]):
+        columns = pattern_indexes.ravel() == pattern
+        values0 = values[control & patterns[:, pattern]][:, columns]
+        values1 = values[~control & patterns[:, pattern]][:, columns]
+        means0 = (get_bootstrap_weights(rng, len(values0), resamples) @ values0) / len(values0)
+        means1 = (get_bootstrap_weights(rng, len(values1), resamples) @ values1) / len(values1)
+        differences[:, columns] = means1 - means0
+
+    return ordered_exceed, unordered_exceed, differences
+
+def resample_conditions(values, codes, control, resamples = 10000, seed = 0, workers = 1, shard_size = 10000, confidence = 0.95):
+    # Returns the permutation p-values of the ordered and unordered variables, and the
+    # bootstrap confidence intervals (low, high) of the experimental - control mean difference.
+    # Shards are seeded from the seed alone, so results don't depend on the number of workers.
+    values = np.asarray(values, dtype=float).reshape(len(control), -1)
+    codes = np.asarray(codes, dtype=int).reshape(len(control), -1)
+    control = np.asarray(control, dtype=bool)
+
+    shard_resamples = [min(shard_size, resamples - start) for start in range(0, resamples, shard_size)]
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(shard_resamples))
+    shard_count = len(shard_resamples)
+
+    # A single shard isn't worth starting workers for
+    shards = list(map_in_workers(run_shard, workers if shard_count > 1 else 1, [values] * shard_count, [codes] * shard_count, [control] * shard_count, shard_resamples, seed_sequences))
+
+    ordered_exceed = sum(shard[0] for shard in shards)
+    unordered_exceed = sum(shard[1] for shard in shards)
+    differences = np.concatenate([shard[2] for shard in shards]) if shard_count > 0 else np.empty((0, values.shape[1]))
+
+    # Counting the observed labelling as one of the permutations keeps p-values above 0
+    ordered_p_values = (ordered_exceed + 1) / (resamples + 1)
+    unordered_p_values = (unordered_exceed + 1) / (resamples + 1)
+
+    alpha = 1 - confidence
+    if len(differences) > 0:
+        intervals = np.quantile(differences, [alpha / 2, 1 - alpha / 2], axis=0)
+    else:
+        intervals = np.full((2, values.shape[1]), np.nan)
+
+    return ordered_p_values, unordered_p_values, intervals
+
+#endregion
@@ -0,0 +1,129 @@
+import numpy as np
+from .profiling import profiler, profiled
+
+###########################################################################
+
+#region Rooms
+
+def get_rooms_info():
+    rooms = {}
+
+    rooms["Start"           ] =  ( 0,  0)
+    rooms["Dinosaur"        ] =  ( 0,  1)
+    rooms["Egypt"           ] =  ( 0,  2)
+    rooms["Cherry Blossom"  ] =  ( 1,  2)
+    rooms["Clocks"          ] =  (-1,  3)
+    rooms["Signs"           ] =  ( 0,  3)
+    rooms["Paintings"       ] =  ( 1,  3)
+    rooms["Volcano"         ] =  (-1,  4)
+    rooms["Aquarium"        ] =  ( 1,  4)
+    rooms["Giant Ladybug"   ] =  (-1,  5)
+    rooms["Sundial"         ] =  ( 0,  5)
+    rooms["Statues"         ] =  ( 1,  5)
+    rooms["Ice Cube"        ] =  (-1,  6)
+    rooms["Mammoth"         ] =  ( 0,  6)
+    rooms["Pond"            ] =  ( 1,  6)
+    rooms["Pots"            ] =  (-1,  7)
+    rooms["Bird Nest"       ] =  ( 0,  7)
+    rooms["Beach"           ] =  (-1,  8)
+    rooms["Face"            ] =  ( 0,  8)
+    rooms["End"             ] =  ( 0,  9)
+
+    return rooms
+
+class RoomIndex:
+    # Looks up rooms by their cell on the regular room grid instead of scanning every room's bounds
+    def __init__(self, rooms_info, portals = False):
+        self.room_names = list(rooms_info.keys())
+        self.room_centres = np.array(list(rooms_info.values()), dtype=float).reshape(-1, 2)
+        self.portals = portals
+
+        portal_mutlipler = 100 if portals else 1
+        self.cell_x = 3 * portal_mutlipler
+        self.cell_z = 6 * portal_mutlipler
+
+        grid_xs = [room[0] for room in rooms_info.values()]
+        grid_zs = [room[1] for room in rooms_info.values()]
+        self.min_grid_x = min(grid_xs, default=0)
+        self.min_grid_z = min(grid_zs, default=0)
+
+        self.table = np.full((max(grid_xs, default=0) - self.min_grid_x + 1, max(grid_zs, default=0) - self.min_grid_z + 1), -1)
+        for room_index, room_name in enumerate(self.room_names):
+            room = rooms_info[room_name]
+            cell = (room[0] - self.min_grid_x, room[1] - self.min_grid_z)
+
+            # Earlier rooms take priority, as they did when scanning the rooms in order
+            if self.table[cell] == -1:
+                self.table[cell] = room_index
+
+        self.start_label = self.room_names.index("Start") if "Start" in self.room_names else -1
+        self.dinosaur_label = self.room_names.index("Dinosaur") if "Dinosaur" in self.room_names else -1
+
+    def get_cells(self, values, cell_size, half_size):
+        # Nearest room centre, falling back to the neighbouring centres for samples right on a boundary
+        nearest = np.rint(values / cell_size)
+        cells = nearest.copy()
+        for neighbour in (nearest - 1, nearest + 1):
+            outside = ~(np.abs(values - cells * cell_size) < half_size)
+            cells[outside] = neighbour[outside]
+
+        inside = np.abs(values - cells * cell_size) < half_size
+        return cells, inside
+
+    @profiled("label_rooms")
+    def locate(self, xs, zs):
+        # Labels are indices into room_names, or -1 when not in any room bounds
+        xs = np.asarray(xs, dtype=float)
+        zs = np.asarray(zs, dtype=float)
+        profiler.count("room_lookups", xs.size)
+
+        cells_x, inside_x = self.get_cells(xs, self.cell_x, 3/2)
+        cells_z, inside_z = self.get_cells(zs, self.cell_z, 6/2)
+
+        table_x = np.where(inside_x, cells_x, self.min_grid_x).astype(int) - self.min_grid_x
+        table_z = np.where(inside_z, cells_z, self.min_grid_z).astype(int) - self.min_grid_z
+        inside = inside_x & inside_z & (table_x >= 0) & (table_x < self.table.shape[0]) & (table_z >= 0) & (table_z < self.table.shape[1])
+
+        labels = np.full(xs.shape, -1)
+        labels[inside] = self.table[table_x[inside], table_z[inside]]
+
+        # Introduce special case to handle "Recording start bounds" inconsistencies
+        if not self.portals and self.start_label != -1:
+            labels[(labels == self.start_label) & (zs > 2.8)] = self.dinosaur_label
+
+        return labels
+
+    def get_control_positions(self, xs, zs, labels):
+        # Positions in the control condition's layout, and which samples could be mapped there
+        if not self.portals:
+            return xs, zs, np.ones(len(xs), dtype=bool)
+
+        # Portal rooms are the same size but centred 100 times further out, so samples keep their offset from their room's centre.
+        # Samples outside every room can't be mapped back
+        mapped = labels != -1
+        centres = self.room_centres[np.where(mapped, labels, 0)]
+
+        return xs - centres[:, 0] * (self.cell_x - 3), zs - centres[:, 1] * (self.cell_z - 6), mapped
+
+    def get_room(self, x, z):
+        label = self.locate([x], [z])[0]
+        return self.room_names[label] if label != -1 else ""
+
+room_indexes = {}
+
+def get_room_index(rooms_info, portals = False):
+    key = (tuple(rooms_info.items()), portals)
+    if key not in room_indexes:
+        room_indexes[key] = RoomIndex(rooms_info, portals)
+
+    return room_indexes[key]
+
+def in_room(x, z, rooms_info, portals = False):
+    room_name = get_room_index(rooms_info, portals).get_room(x, z)
+
+    if room_name == "":
+        print("ERROR: Player not in any room bounds at x=" + str(x) + ", z=" + str(z))
+
+    return room_name
+
+#endregion
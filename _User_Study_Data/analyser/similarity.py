@@ -0,0 +1,197 @@
+import itertools
+import numpy as np
+import pandas as pd
+from .rooms import get_room_index
+from .users import read_participant_data
+from .downsampling import resample_trajectory
+from .workers import map_in_workers
+from .profiling import profiler, profiled
+
+# How similarly participants move through the museum, as participants x participants distance matrices of:
+# - room sequences: the edit distance between the sequences of rooms visited, i.e. the run-length encoded room labels
+#   (one entry per room visit rather than per sample)
+# - paths: the dynamic time warping (DTW) distance between the (x, z) paths in the control layout, resampled at a low
+#   rate, as the mean distance (m) between matched samples
+# Both distances are computed a row of the dynamic programming table at a time with array operations. With a cutoff, pairs
+# whose cheap lower bound is over the cutoff are skipped, pairs are abandoned as soon as the table shows they're over it,
+# and every pair over the cutoff is left as inf. The pairs are split into shards over worker processes.
+#
+# Matrices are returned in condensed form (the upper triangle, row by row, as scipy's squareform uses).
+
+###########################################################################
+
+#region Distances
+
+def get_room_sequence(path_info, rooms_info):
+    # Room of each room visit, as indices into the rooms (or len(rooms_info) when not in any room bounds)
+    room_codes = {room_name: code for code, room_name in enumerate(list(rooms_info.keys()) + [""])}
+
+    room_sequence = np.zeros(path_info["total_room_visits"], dtype=int)
+    for room_name, room in path_info["visited"].items():
+        room_sequence[room["sequence"]] = room_codes[room_name]
+
+    return room_sequence
+
+def get_edit_distance(sequence0, sequence1, cutoff = np.inf):
+    # Levenshtein distance, one row per entry of sequence0. Within a row, insertions are a running minimum of (distance - column)
+    columns = np.arange(len(sequence1) + 1)
+    row = columns.copy()
+    for i, value in enumerate(sequence0, 1):
+        substituted = row[:-1] + (sequence1 != value)
+        row = np.concatenate(([i], np.minimum(row[1:] + 1, substituted)))
+        row = np.minimum.accumulate(row - columns) + columns
+
+        # Every alignment passes through each row, so the row's minimum only grows
+        if row.min() > cutoff:
+            return np.inf
+
+    return float(row[-1]) if row[-1] <= cutoff else np.inf
+
+def get_edit_distance_lower_bound(sequence0, sequence1, room_count):
+    # Each edit changes the count of at most one room up and one down
+    differences = np.bincount(sequence0, minlength=room_count) - np.bincount(sequence1, minlength=room_count)
+    return float(max(differences[differences > 0].sum(), -differences[differences < 0].sum()))
+
+def get_dtw_distance(path0, path1, cutoff = np.inf):
+    # Mean distance between matched samples of the best warping, one anti-diagonal (i + j) of the table at a time.
+    # Each anti-diagonal only depends on the 2 before it, and is indexed by row so its neighbours are slices of them
+    if len(path1) == 1:
+        path0, path1 = path1, path0
+    count0 = len(path0)
+    count1 = len(path1)
+    if count0 == 0 or count1 == 0:
+        return np.inf
+
+    costs = np.linalg.norm(path0[:, None, :] - path1[None, :, :], axis=2)
+    if count1 == 1:
+        return float(costs.sum()) / (count0 + count1) if costs.sum() <= cutoff * (count0 + count1) else np.inf
+
+    # Cells of an anti-diagonal are count1 - 1 apart in the flattened costs
+    flat_costs = costs.ravel()
+
+    total_cutoff = cutoff * (count0 + count1)
+    previous2 = np.full(count0 + 1, np.inf)
+    previous2[0] = 0
+    previous1 = np.full(count0 + 1, np.inf)
+    for diagonal in range(2, count0 + count1 + 1):
+        low = max(1, diagonal - count1)
+        high = min(count0, diagonal - 1)
+
+        first = (low - 1) * count1 + (diagonal - low - 1)
+        current = np.full(count0 + 1, np.inf)
+        current[low:high + 1] = flat_costs[first:first + (high - low) * (count1 - 1) + 1:count1 - 1]
+        current[low:high + 1] += np.minimum(np.minimum(previous2[low - 1:high], previous1[low - 1:high]), previous1[low:high + 1])
+
+        # Warpings step at most 2 anti-diagonals at a time, so every warping passes through one of every 2 consecutive anti-diagonals
+        if min(current[low:high + 1].min(), previous1.min()) > total_cutoff:
+            return np.inf
+
+        previous2, previous1 = previous1, current
+
+    return float(previous1[count0]) / (count0 + count1) if previous1[count0] <= total_cutoff else np.inf
+
+def get_dtw_lower_bound(path0, path1):
+    # Every warping matches the first samples together and the last samples together
+    if len(path0) == 0 or len(path1) == 0:
+        return np.inf
+
+    first_cost = np.linalg.norm(path0[0] - path1[0])
+    if len(path0) == 1 and len(path1) == 1:
+        return float(first_cost) / 2
+
+    return float(first_cost + np.linalg.norm(path0[-1] - path1[-1])) / (len(path0) + len(path1))
+
+#endregion
+
+###########################################################################
+
+#region Distance Matrices
+
+def get_pair_distances(kind, items, pairs, cutoff = np.inf, room_count = 0):
+    # Distances of one shard of the pairs
+    distances = np.full(len(pairs), np.inf)
+    pruned = 0
+    for pair_index, (i, j) in enumerate(pairs):
+        if kind == "room_sequence":
+            if cutoff < np.inf and get_edit_distance_lower_bound(items[i], items[j], room_count) > cutoff:
+                pruned += 1
+                continue
+            distances[pair_index] = get_edit_distance(items[i], items[j], cutoff)
+        else:
+            if cutoff < np.inf and get_dtw_lower_bound(items[i], items[j]) > cutoff:
+                pruned += 1
+                continue
+            distances[pair_index] = get_dtw_distance(items[i], items[j], cutoff)
+
+    return distances, pruned
+
+def get_distance_matrix(kind, items, cutoff = None, workers = 1, room_count = 0):
+    # Condensed distance matrix of items ("room_sequence" or "path") over all pairs i < j
+    cutoff = cutoff if cutoff is not None else np.inf
+    pairs = list(itertools.combinations(range(len(items)), 2))
+
+    # A few shards per worker, so slow pairs (long paths) even out between workers
+    shard_count = max(1, min(len(pairs), workers * 4)) if workers > 1 else 1
+    shards = [pairs[start::shard_count] for start in range(shard_count)]
+
+    distances = np.full(len(pairs), np.inf)
+    results = map_in_workers(get_pair_distances, workers, [kind] * shard_count, [items] * shard_count, shards, [cutoff] * shard_count, [room_count] * shard_count)
+    for start, (shard_distances, pruned) in enumerate(results):
+        distances[start::shard_count] = shard_distances
+        profiler.count("pairs_pruned", pruned)
+
+    profiler.count("pairs_compared", len(pairs))
+    return distances
+
+def get_participant_path(id, rooms_info, rate = 1, cache = None):
+    # (x, z) path in the control layout at rate Hz, without the samples outside every room in the portals condition
+    trajectory, labels = read_participant_data(id, rooms_info, cache)
+    trajectory, labels = resample_trajectory(trajectory, labels, rate)
+
+    xs, zs, mapped = get_room_index(rooms_info, (id % 2) == 1).get_control_positions(trajectory[:, 1], trajectory[:, 3], labels)
+    return np.column_stack((xs, zs))[mapped]
+
+@profiled("similarity")
+def get_similarity_matrices(user_infos, rooms_info, rate = 1, cutoff = None, workers = 1, cache = None):
+    # Condensed room sequence and path distance matrices between the participants with a recording, in ID order
+    ids = sorted([id for id, user_info in user_infos.items() if not user_info.missing])
+    room_sequences = [get_room_sequence(user_infos[id].data["path"], rooms_info) for id in ids]
+
+    paths = list(map_in_workers(get_participant_path, workers, ids, [rooms_info] * len(ids), [rate] * len(ids), [cache] * len(ids)))
+
+    matrices = {}
+    matrices["room_sequence"] = get_distance_matrix("room_sequence", room_sequences, None, workers, len(rooms_info) + 1)
+    matrices["path"] = get_distance_matrix("path", paths, cutoff, workers)
+
+    return ids, matrices
+
+def get_square_matrix(distances, count):
+    square = np.zeros((count, count))
+    rows, columns = np.triu_indices(count, 1)
+    square[rows, columns] = distances
+    square[columns, rows] = distances
+
+    return square
+
+def get_similarity_metrics(ids, matrices, cutoff = None):
+    # One row per participant of their mean distance to the other participants of the same condition, so the
+    # conditions' homogeneity can be compared like any other variable (e.g. with compare_all_conditions)
+    # Pairs pruned at the cutoff count as the cutoff, and participants without a path aren't counted
+    ids = np.array(ids)
+    control = (ids % 2) == 0
+    same_condition = (control[:, None] == control[None, :]) & ~np.eye(len(ids), dtype=bool)
+
+    metrics = pd.DataFrame(index=pd.Index(ids, name="id"))
+    for kind, distances in matrices.items():
+        distances = np.minimum(distances, cutoff) if cutoff is not None and kind == "path" else distances
+        square = get_square_matrix(distances, len(ids))
+        counted = same_condition & np.isfinite(square)
+        metrics["similarity." + kind] = np.where(counted, square, 0).sum(axis=1) / np.where(counted.any(axis=1), counted.sum(axis=1), np.nan)
+
+    return metrics
+
+def write_similarity(ids, matrices, filename):
+    # Condensed matrices and the participant IDs of their rows, to be expanded with get_square_matrix (or scipy's squareform)
+    np.savez_compressed(filename, ids=np.array(ids), **matrices)
+
+#endregion
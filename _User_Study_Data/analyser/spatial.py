@@ -0,0 +1,106 @@
+import numpy as np
+from .profiling import profiled
+
+###########################################################################
+
+#region Spatial Graphs
+
+@profiled("get_graph")
+def get_graph(id, rooms_info):
+    # Imported here, so modules that don't read graphs don't pay for networkx
+    import networkx as nx
+
+    graph = nx.Graph()
+    for room_name in list(rooms_info.keys()):
+        graph.add_node(room_name)
+
+    spatial_data_filename = 'Spatial_' + str(id) + '.txt'
+    try:
+        with open(spatial_data_filename, 'r') as file:
+            for raw_line in file:
+                raw_line = raw_line.rstrip("\n")
+                if raw_line == "" or raw_line[-1] == "=":
+                    continue
+
+                line_info = raw_line.split("=")
+                left_room = line_info[0]
+                right_rooms = line_info[1].split(",")
+
+                for right_room in right_rooms:
+                    graph.add_edge(left_room, right_room)
+    except FileNotFoundError:
+        print(f"File '{spatial_data_filename}' not found.")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+
+    #import matplotlib.pyplot as plt
+    #pos = nx.spring_layout(graph)
+    #nx.draw(graph, pos, with_labels=True, node_size=3000, node_color="skyblue", connectionstyle="arc3,rad=0.2")
+    #plt.title("Graph")
+    #plt.show()
+
+    return graph
+
+def get_adjacency_matrix(graph, node_indexes):
+    # Symmetric boolean matrix of the graph's edges over the given node order
+    adjacency = np.zeros((len(node_indexes), len(node_indexes)), dtype=bool)
+    for left_room, right_room in graph.edges():
+        adjacency[node_indexes[left_room], node_indexes[right_room]] = True
+        adjacency[node_indexes[right_room], node_indexes[left_room]] = True
+
+    return adjacency
+
+def get_degrees(adjacency):
+    # Self-loops count twice towards a node's degree, as in networkx
+    return adjacency.sum(axis=-1) + np.diagonal(adjacency, axis1=-2, axis2=-1)
+
+def score_spatial_graphs(id_graphs, visited_rooms, truth_graph):
+    # Scores many participants' spatial graphs against the truth graph at once
+    # visited_rooms holds the names of the rooms each participant visited
+    # Returns arrays of each score with one value per participant
+    node_names = list(truth_graph.nodes())
+    for id_graph in id_graphs:
+        node_names += [node for node in id_graph.nodes() if node not in node_names]
+    node_indexes = {node: i for i, node in enumerate(node_names)}
+
+    truth_adjacency = get_adjacency_matrix(truth_graph, node_indexes)
+    id_adjacencies = np.array([get_adjacency_matrix(id_graph, node_indexes) for id_graph in id_graphs]).reshape(len(id_graphs), len(node_names), len(node_names))
+    visited = np.array([np.isin(node_names, list(rooms)) for rooms in visited_rooms]).reshape(len(id_graphs), len(node_names))
+
+    # Each undirected edge is counted once, from the upper triangle
+    upper = np.triu(np.ones((len(node_names), len(node_names)), dtype=bool))
+    correct = id_adjacencies & truth_adjacency & upper
+    missed = ~id_adjacencies & truth_adjacency & upper
+    incorrect = id_adjacencies & ~truth_adjacency & upper
+
+    # How many of each edge's two rooms were visited
+    edge_visits = visited[:, :, None].astype(int) + visited[:, None, :]
+
+    scores = {}
+    scores["correct_edges"] = correct.sum(axis=(1, 2))
+    scores["incorrect_edges"] = incorrect.sum(axis=(1, 2))
+    scores["missed_edges"] = missed.sum(axis=(1, 2))
+    scores["visited_correct_edges"] = (correct & (edge_visits >= 1)).sum(axis=(1, 2))
+    scores["visited_incorrect_edges"] = (incorrect & (edge_visits >= 1)).sum(axis=(1, 2))
+    scores["visited_missed_edges"] = (missed & (edge_visits >= 1)).sum(axis=(1, 2))
+    scores["both_visited_correct_edges"] = (correct & (edge_visits >= 2)).sum(axis=(1, 2))
+    scores["both_visited_incorrect_edges"] = (incorrect & (edge_visits >= 2)).sum(axis=(1, 2))
+    scores["both_visited_missed_edges"] = (missed & (edge_visits >= 2)).sum(axis=(1, 2))
+
+    # Degrees are compared over the rooms of the truth graph
+    truth_nodes = np.arange(len(node_names)) < truth_graph.number_of_nodes()
+    node_offsets = (get_degrees(id_adjacencies) - get_degrees(truth_adjacency)) * truth_nodes
+    visited_offsets = node_offsets * visited
+
+    scores["correct_degrees"] = ((node_offsets == 0) & truth_nodes).sum(axis=1)
+    scores["incorrect_degrees"] = ((node_offsets != 0) & truth_nodes).sum(axis=1)
+    scores["total_degree_offset"] = node_offsets.sum(axis=1)
+    scores["total_degree_difference"] = np.abs(node_offsets).sum(axis=1)
+    scores["visited_correct_degrees"] = ((node_offsets == 0) & truth_nodes & visited).sum(axis=1)
+    scores["visited_incorrect_degrees"] = ((node_offsets != 0) & truth_nodes & visited).sum(axis=1)
+    scores["visited_total_degree_offset"] = visited_offsets.sum(axis=1)
+    scores["visited_total_degree_difference"] = np.abs(visited_offsets).sum(axis=1)
+
+    return scores
+
+#endregion
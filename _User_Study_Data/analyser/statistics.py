@@ -0,0 +1,223 @@
+import math
+import numpy as np
+import pandas as pd
+from collections import Counter
+from .resampling import resample_conditions
+from .profiling import profiler, profiled
+
+###########################################################################
+
+#region Analysing Data
+
+def round_sig(x, sig=3):
+    return round(x, sig-int(math.floor(math.log10(abs(x))))-1) if x != 0 else 0
+
+def get_compared_variables():
+    variables = []
+
+    variables.append(["prestudy","baseline"])
+
+    variables.append(["path","total_time"])
+    variables.append(["path","visited"])
+    variables.append(["path","total_room_visits"])
+    variables.append(["path","distance_per_time"])
+    variables.append(["path","turn_per_time"])
+
+    variables.append(["poststudy","gender"])
+    variables.append(["poststudy","age"])
+    variables.append(["poststudy","xr_xp"])
+    variables.append(["poststudy","joystick_xp"])
+    variables.append(["poststudy","enjoy_walk"])
+    variables.append(["poststudy","enjoy_museum"])
+    variables.append(["poststudy","play_games"])
+
+    variables.append(["poststudy","objects_seen"])
+    variables.append(["poststudy","objects_seen_level"])
+    variables.append(["poststudy","objects_confidence"])
+    variables.append(["poststudy","distractors_seen"])
+    variables.append(["poststudy","distractors_seen_level"])
+    variables.append(["poststudy","distractors_confidence"])
+    variables.append(["poststudy","other_objects_length"])
+
+    variables.append(["poststudy","easy_navigate"])
+    variables.append(["poststudy","easy_object_test"])
+    variables.append(["poststudy","easy_spatial_test"])
+
+    variables.append(["spatial","correct_edges"])
+    variables.append(["spatial","incorrect_edges"])
+    variables.append(["spatial","missed_edges"])
+    variables.append(["spatial","visited_correct_edges"])
+    variables.append(["spatial","visited_incorrect_edges"])
+    variables.append(["spatial","visited_missed_edges"])
+    variables.append(["spatial","both_visited_correct_edges"])
+    variables.append(["spatial","both_visited_incorrect_edges"])
+    variables.append(["spatial","both_visited_missed_edges"])
+
+    variables.append(["spatial","correct_degrees"])
+    variables.append(["spatial","incorrect_degrees"])
+    variables.append(["spatial","total_degree_offset"])
+    variables.append(["spatial","total_degree_difference"])
+    variables.append(["spatial","visited_correct_degrees"])
+    variables.append(["spatial","visited_incorrect_degrees"])
+    variables.append(["spatial","visited_total_degree_offset"])
+    variables.append(["spatial","visited_total_degree_difference"])
+
+    return variables
+
+def is_recording_variable(variable):
+    # Path metrics and the spatial scores of the rooms visited, which come from the participant's recording
+    return variable[0] == "path" or (variable[0] == "spatial" and "visited" in variable[1])
+
+@profiled("metrics_table")
+def get_metrics_table(user_infos, variables):
+    # One row per participant and one column per variable (e.g. "path.total_time"), with lists and dicts counted by their length
+    # Missing participants (without a recording) have NaN recording variables, and are only left out of those comparisons
+    ids = sorted(user_infos.keys())
+    rows = []
+    for id in ids:
+        row = {}
+        for variable in variables:
+            if user_infos[id].missing and is_recording_variable(variable):
+                row[".".join(variable)] = np.nan
+                continue
+
+            target_value = user_infos[id].data
+            for value_type in variable:
+                target_value = target_value[value_type]
+
+            if isinstance(target_value, list) or isinstance(target_value, dict):
+                target_value = len(target_value)
+
+            row[".".join(variable)] = target_value
+        rows.append(row)
+
+    return pd.DataFrame(rows, index=pd.Index(ids, name="id"), columns=[".".join(variable) for variable in variables])
+
+@profiled("statistics")
+def compare_all_conditions(metrics, resamples = 0, seed = 0, workers = 1):
+    # Tests every variable of the metrics table between conditions, with one row of results per variable
+    # With resamples, permutation p-values and bootstrap 95% confidence intervals (E - C) are added too
+    # scipy is slow to import, so it's only imported once statistics are needed
+    from scipy.stats import ttest_ind, mannwhitneyu, chi2_contingency
+
+    control = (metrics.index % 2) == 0
+
+    # Variables with any text answers are compared as categories
+    ordered = [not metrics[column].map(lambda value: isinstance(value, str)).any() for column in metrics.columns]
+    ordered_columns = [column for column, is_ordered in zip(metrics.columns, ordered) if is_ordered]
+
+    results = pd.DataFrame(index=pd.Index(metrics.columns, name="variable"))
+    results["ordered"] = ordered
+    for column in ["c_mean", "e_mean", "t_test_p_value", "wilcoxon_p_value", "chi_p_value"]:
+        results[column] = np.nan
+    for column in ["c_counts", "e_counts"]:
+        results[column] = None
+
+    if len(ordered_columns) > 0:
+        values = metrics[ordered_columns].to_numpy(dtype=float)
+        values0 = values[control]
+        values1 = values[~control]
+
+        # Each variable is compared over the participants with a value for it
+        results.loc[ordered_columns, "c_mean"] = np.nanmean(values0, axis=0)
+        results.loc[ordered_columns, "e_mean"] = np.nanmean(values1, axis=0)
+        results.loc[ordered_columns, "t_test_p_value"] = ttest_ind(values0, values1, axis=0, nan_policy="omit").pvalue
+        results.loc[ordered_columns, "wilcoxon_p_value"] = mannwhitneyu(values0, values1, axis=0, nan_policy="omit").pvalue
+        profiler.count("tests_run", 2 * len(ordered_columns))
+
+    for column, is_ordered in zip(metrics.columns, ordered):
+        if is_ordered:
+            continue
+
+        list0 = metrics.loc[control, column].dropna().tolist()
+        list1 = metrics.loc[~control, column].dropna().tolist()
+
+        observed = []
+        for category in sorted(set(list0 + list1), key=str):
+            observed.append([list0.count(category), list1.count(category)])
+
+        chi2, chi_p_value, _, _ = chi2_contingency(observed)
+        profiler.count("tests_run")
+
+        results.at[column, "c_counts"] = dict(sorted(dict(Counter(list0)).items()))
+        results.at[column, "e_counts"] = dict(sorted(dict(Counter(list1)).items()))
+        results.at[column, "chi_p_value"] = chi_p_value
+
+    results["t_test_significant"] = results["t_test_p_value"] < 0.05
+    results["wilcoxon_significant"] = results["wilcoxon_p_value"] < 0.05
+    results["chi_significant"] = results["chi_p_value"] < 0.05
+
+    if resamples > 0:
+        unordered_columns = [column for column, is_ordered in zip(metrics.columns, ordered) if not is_ordered]
+
+        values = metrics[ordered_columns].to_numpy(dtype=float)
+        # Missing values are NaN in values and -1 in codes
+        codes = np.column_stack([pd.factorize(metrics[column].astype(str).where(metrics[column].notna()))[0] for column in unordered_columns]) if len(unordered_columns) > 0 else np.empty((len(metrics), 0), dtype=int)
+
+        with profiler.stage("resampling"):
+            ordered_p_values, unordered_p_values, intervals = resample_conditions(values, codes, control, resamples, seed, workers)
+        profiler.count("tests_run", len(metrics.columns))
+        profiler.count("resamples", resamples)
+
+        results["permutation_p_value"] = np.nan
+        results["bootstrap_ci_low"] = np.nan
+        results["bootstrap_ci_high"] = np.nan
+        if len(ordered_columns) > 0:
+            results.loc[ordered_columns, "permutation_p_value"] = ordered_p_values
+            results.loc[ordered_columns, "bootstrap_ci_low"] = intervals[0]
+            results.loc[ordered_columns, "bootstrap_ci_high"] = intervals[1]
+        if len(unordered_columns) > 0:
+            results.loc[unordered_columns, "permutation_p_value"] = unordered_p_values
+        results["permutation_significant"] = results["permutation_p_value"] < 0.05
+
+    return results
+
+def print_comparison(result):
+    variable = result.name.split(".")
+
+    print("#")
+
+    if result["ordered"]:
+        print(variable, "(Ordered):")
+
+        print("C Mean =", round_sig(result["c_mean"]))
+        print("E Mean =", round_sig(result["e_mean"]))
+        print("T-test P-value =", round(result["t_test_p_value"], 3))
+        print("Wilcoxon P-value =", round(result["wilcoxon_p_value"], 3))
+        if result["wilcoxon_significant"]:
+            if result["t_test_significant"]:
+                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! ^ Double Significant ^ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            else:
+                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! ^ Wilcoxon Significant ^ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        elif result["t_test_significant"]:
+            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! ^ T-test Significant ^ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+
+        if "bootstrap_ci_low" in result:
+            print("Bootstrap 95% CI (E - C) =", [round_sig(result["bootstrap_ci_low"]), round_sig(result["bootstrap_ci_high"])])
+    else:
+        print(variable, "(Unordered):")
+
+        print("C =", result["c_counts"])
+        print("E =", result["e_counts"])
+        print("Chi P-value =", result["chi_p_value"])
+
+        if result["chi_significant"]:
+            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! ^ Chi Significant ^ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+
+    if "permutation_p_value" in result:
+        print("Permutation P-value =", round(result["permutation_p_value"], 3))
+        if result["permutation_significant"]:
+            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!! ^ Permutation Significant ^ !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+
+def compare_conditions(variable, user_infos):
+    results = compare_all_conditions(get_metrics_table(user_infos, [variable]))
+    print_comparison(results.iloc[0])
+
+def write_results(results, filename):
+    # Results table as ".json" records, or as ".csv" otherwise
+    if filename.endswith(".json"):
+        results.reset_index().to_json(filename, orient="records", indent=4, double_precision=15)
+    else:
+        results.to_csv(filename)
+
+#endregion
@@ -0,0 +1,86 @@
+import os
+import json
+from .users import UserInfo
+from .cache import get_file_signature
+
+# Persisted path and spatial metrics (and downsampling drift) of each participant, so that reruns during a study only process the participants
+# whose input files changed. Each entry is keyed by the participant's input files (their size and modification time,
+# or their contents' hash) and the settings they were processed with. Survey answers aren't stored, as both surveys
+# are read whole and extracted again on every run. Participants without a recording are stored as missing, and as a missing
+# file is part of their key, they're processed again once their recording arrives.
+
+STORE_VERSION = 2
+
+# Sections of a participant's data that come from their own input files
+STORED_SECTIONS = ["path", "spatial", "drift"]
+
+class MetricsStore:
+    def __init__(self, filename = "_Metrics.json", hash_contents = False):
+        self.filename = filename
+        self.hash_contents = hash_contents
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filename, "r") as file:
+                store = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable metrics store '{self.filename}': {str(e)}")
+            return
+
+        if store.get("version") == STORE_VERSION:
+            self.entries = store["participants"]
+
+    def save(self):
+        # Written under a temporary name first, so an interrupted run never leaves a partial store
+        temporary_filename = self.filename + "." + str(os.getpid()) + ".tmp"
+        with open(temporary_filename, "w") as file:
+            json.dump({"version": STORE_VERSION, "participants": self.entries}, file)
+        os.replace(temporary_filename, self.filename)
+
+    def get_signature(self, filename):
+        # None for missing files, so a participant is processed again once their file arrives
+        return get_file_signature(filename, self.hash_contents)
+
+    def get_key(self, id, rooms_info, *settings):
+        # settings are any other options the participant's data depends on (chunk size, downsampling, ...)
+        filenames = [str(id) + ".dat", str(id) + ".txt", "Spatial_" + str(id) + ".txt", "Spatial_Truth.txt"]
+        key = [list(rooms_info.items()), list(settings), self.hash_contents, [[filename, self.get_signature(filename)] for filename in filenames]]
+
+        # Same form as after a round trip through the store's file, so keys compare equal
+        return json.loads(json.dumps(key))
+
+    def contains(self, id, key):
+        entry = self.entries.get(str(id))
+        return entry is not None and entry["key"] == key
+
+    def get_user_info(self, id):
+        user_info = UserInfo()
+        user_info.missing = self.entries[str(id)].get("missing", False)
+        for section in STORED_SECTIONS:
+            if section in self.entries[str(id)]:
+                user_info.data[section] = self.entries[str(id)][section]
+
+        return user_info
+
+    def get_output(self, id):
+        return self.entries[str(id)]["output"]
+
+    def set(self, id, key, user_info, output):
+        entry = {}
+        entry["key"] = key
+        entry["missing"] = user_info.missing
+        for section in STORED_SECTIONS:
+            if section in user_info.data:
+                entry[section] = user_info.data[section]
+        entry["output"] = output
+
+        self.entries[str(id)] = entry
+
+    def clear(self):
+        self.entries = {}
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
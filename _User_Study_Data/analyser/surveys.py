@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from .profiling import profiler, profiled
+
+# Reads the prestudy and poststudy Qualtrics exports (see _Explanation.md for their columns).
+# Only the analysed columns are read, with their types, and answers are scored a whole column at a time.
+
+###########################################################################
+
+#region Columns
+
+# Rows of each export before the answers: the column names, then Qualtrics' 3 rows of question IDs, prompts and value descriptions
+SURVEY_HEADER_ROWS = 4
+
+RESEARCH_ID = 0
+
+PRESTUDY_COLUMNS = {RESEARCH_ID: int, 2: int}
+BASELINE_MEMORY = 2
+
+GENDER = 1
+AGE = 3
+XR_XP = 6
+JOYSTICK_XP = 7
+ENJOY_WALK = 8
+ENJOY_MUSEUM = 9
+PLAY_GAMES = 10
+OBJECTS_SEEN = [17 + (i * 2) for i in range(6)]
+OBJECTS_SURETY = [18 + (i * 2) for i in range(6)]
+DISTRACTORS_SEEN = [29 + (i * 2) for i in range(12)]
+DISTRACTORS_SURETY = [30 + (i * 2) for i in range(12)]
+OTHER_OBJECTS = 53
+EASY_NAVIGATE = 54
+EASY_OBJECT_TEST = 55
+EASY_SPATIAL_TEST = 56
+
+POSTSTUDY_COLUMNS = {RESEARCH_ID: int, GENDER: str, AGE: int, XR_XP: str, JOYSTICK_XP: str, ENJOY_WALK: int, ENJOY_MUSEUM: int, PLAY_GAMES: str, OTHER_OBJECTS: str, EASY_NAVIGATE: int, EASY_OBJECT_TEST: int, EASY_SPATIAL_TEST: int}
+POSTSTUDY_COLUMNS.update({column: str for column in OBJECTS_SEEN + DISTRACTORS_SEEN})
+POSTSTUDY_COLUMNS.update({column: int for column in OBJECTS_SURETY + DISTRACTORS_SURETY})
+
+#endregion
+
+###########################################################################
+
+#region Surveys
+
+def read_survey(filename, columns):
+    # Columns are labelled by their position in the export
+    with profiler.stage("read_surveys"):
+        return pd.read_csv(filename, header=None, skiprows=SURVEY_HEADER_ROWS, usecols=list(columns.keys()), dtype=columns)
+
+def get_recognition_scores(seen, surety):
+    # seen is True where an object was answered "Yes", and surety holds the (negated) Likert answers of how sure
+    seen_level = np.where(seen, -surety - 1, surety)
+
+    return seen.sum(axis=1), seen_level.sum(axis=1), (-surety).sum(axis=1)
+
+def get_prestudy_infos(prestudy_file = 'prestudy.csv'):
+    prestudy_df = read_survey(prestudy_file, PRESTUDY_COLUMNS)
+
+    prestudy_infos = pd.DataFrame(index=pd.Index(prestudy_df[RESEARCH_ID], name="id"))
+    prestudy_infos["baseline"] = prestudy_df[BASELINE_MEMORY].to_numpy()
+
+    return prestudy_infos
+
+def get_poststudy_infos(poststudy_file = 'poststudy.csv'):
+    poststudy_df = read_survey(poststudy_file, POSTSTUDY_COLUMNS)
+
+    poststudy_infos = pd.DataFrame(index=pd.Index(poststudy_df[RESEARCH_ID], name="id"))
+    poststudy_infos["gender"] = poststudy_df[GENDER].to_numpy()
+    poststudy_infos["age"] = poststudy_df[AGE].to_numpy()
+    poststudy_infos["xr_xp"] = poststudy_df[XR_XP].to_numpy()
+    poststudy_infos["joystick_xp"] = poststudy_df[JOYSTICK_XP].to_numpy()
+    poststudy_infos["enjoy_walk"] = -poststudy_df[ENJOY_WALK].to_numpy()
+    poststudy_infos["enjoy_museum"] = -poststudy_df[ENJOY_MUSEUM].to_numpy()
+    poststudy_infos["play_games"] = poststudy_df[PLAY_GAMES].to_numpy()
+
+    objects_scores = get_recognition_scores(poststudy_df[OBJECTS_SEEN].to_numpy() == "Yes", poststudy_df[OBJECTS_SURETY].to_numpy())
+    distractors_scores = get_recognition_scores(poststudy_df[DISTRACTORS_SEEN].to_numpy() == "Yes", poststudy_df[DISTRACTORS_SURETY].to_numpy())
+
+    poststudy_infos["objects_seen"], poststudy_infos["objects_seen_level"], poststudy_infos["objects_confidence"] = objects_scores
+    poststudy_infos["distractors_seen"], poststudy_infos["distractors_seen_level"], poststudy_infos["distractors_confidence"] = distractors_scores
+    poststudy_infos["other_objects_length"] = poststudy_df[OTHER_OBJECTS].fillna("").str.len().to_numpy()
+
+    poststudy_infos["easy_navigate"] = -poststudy_df[EASY_NAVIGATE].to_numpy()
+    poststudy_infos["easy_object_test"] = -poststudy_df[EASY_OBJECT_TEST].to_numpy()
+    poststudy_infos["easy_spatial_test"] = -poststudy_df[EASY_SPATIAL_TEST].to_numpy()
+
+    return poststudy_infos
+
+def add_survey_infos(user_infos, section, survey_infos):
+    # Later answers from the same participant replace earlier ones
+    survey_infos = survey_infos[~survey_infos.index.duplicated(keep="last")]
+
+    for id, answers in zip(survey_infos.index.tolist(), survey_infos.to_dict("records")):
+        user_infos[id].data[section].update(answers)
+
+@profiled("survey_extraction")
+def infer_survey_infos(user_infos, prestudy_file = 'prestudy.csv', poststudy_file = 'poststudy.csv'):
+    add_survey_infos(user_infos, "prestudy", get_prestudy_infos(prestudy_file))
+    add_survey_infos(user_infos, "poststudy", get_poststudy_infos(poststudy_file))
+
+#endregion
@@ -0,0 +1,119 @@
+import io
+import itertools
+import numpy as np
+from .rooms import get_room_index
+from .quaternions import step_angles
+
+###########################################################################
+
+#region Trajectories
+
+def parse_trajectory(raw_data):
+    # Rows of the (N, 8) array are samples of: time, position x, y, z, rotation x, y, z, w
+    if raw_data.strip() == "":
+        return np.empty((0, 8))
+
+    return np.loadtxt(io.StringIO(raw_data), delimiter=",", ndmin=2)
+
+def load_trajectory(filename):
+    with open(filename, 'r') as file:
+        return parse_trajectory(file.read())
+
+def iter_trajectory_chunks(filename, chunk_size = 65536):
+    # Reads a trajectory (.txt) as consecutive (chunk_size, 8) blocks, so memory use doesn't grow with the recording
+    with open(filename, 'r') as file:
+        while True:
+            raw_lines = list(itertools.islice(file, chunk_size))
+            if len(raw_lines) == 0:
+                return
+
+            yield parse_trajectory("".join(raw_lines))
+
+class PathAccumulator:
+    # Path statistics of a trajectory that is added in consecutive chunks
+    def __init__(self, rooms_info, portals):
+        self.rooms_info = rooms_info
+        self.portals = portals
+
+        # Label -1 (not in any room bounds) indexes the trailing "" room name
+        self.room_names = list(rooms_info.keys()) + [""]
+        self.visited = {}
+
+        self.last_sample = None
+        self.last_label = -1
+        self.room_visits = 0
+
+        self.total_distance = 0
+        self.total_turn = 0
+
+    def add(self, trajectory, labels = None):
+        if len(trajectory) == 0:
+            return
+
+        positions = trajectory[:, 1:4]
+        if labels is None:
+            labels = get_room_index(self.rooms_info, self.portals).locate(positions[:, 0], positions[:, 2])
+
+        for i in np.flatnonzero(labels == -1):
+            print("ERROR: Player not in any room bounds at x=" + str(positions[i, 0]) + ", z=" + str(positions[i, 2]))
+
+        # Steps are taken from the previous sample, which for the first sample of a chunk is the end of the last chunk
+        first_chunk = self.last_sample is None
+        samples = trajectory if first_chunk else np.concatenate((self.last_sample[None, :], trajectory))
+
+        step_times = np.diff(samples[:, 0])
+        step_distances = np.linalg.norm(np.diff(samples[:, 1:4], axis=0), axis=1)
+        step_turns = step_angles(samples[:, 4:8])
+        if first_chunk:
+            step_times, step_distances, step_turns = (np.concatenate(([0], steps)) for steps in (step_times, step_distances, step_turns))
+
+        # A sample either enters a new room (a room visit) or is a step within the last room
+        last_labels = np.concatenate(([self.last_label], labels[:-1]))
+        entered = labels != last_labels
+        stayed = ~entered
+        if first_chunk:
+            stayed[0] = False
+
+        visit_numbers = self.room_visits + np.cumsum(entered) - 1
+
+        # Rooms are recorded in the order they were first visited
+        unique_labels, first_indices = np.unique(labels, return_index=True)
+        for label in unique_labels[np.argsort(first_indices)]:
+            current_room = self.room_names[label]
+            room_samples = labels == label
+            room_steps = stayed & room_samples
+
+            if current_room not in self.visited:
+                self.visited[current_room] = {}
+                self.visited[current_room]["order"] = len(self.visited) - 1
+                self.visited[current_room]["sequence"] = []
+                self.visited[current_room]["total_time"] = 0
+                self.visited[current_room]["total_distance"] = 0
+                self.visited[current_room]["total_turn"] = 0
+
+            self.visited[current_room]["sequence"] += visit_numbers[entered & room_samples].tolist()
+            self.visited[current_room]["total_time"] += float(step_times[room_steps].sum())
+            self.visited[current_room]["total_distance"] += float(step_distances[room_steps].sum())
+            self.visited[current_room]["total_turn"] += float(step_turns[room_steps].sum())
+
+        self.total_distance += float(step_distances[stayed].sum())
+        self.total_turn += float(step_turns[stayed].sum())
+        self.room_visits += int(np.count_nonzero(entered))
+
+        self.last_sample = np.array(trajectory[-1])
+        self.last_label = labels[-1]
+
+    def get_path_info(self):
+        last_time = float(self.last_sample[0]) if self.last_sample is not None else 0
+
+        path_info = {}
+        path_info["visited"] = self.visited
+        path_info["total_room_visits"] = self.room_visits
+        path_info["total_time"] = last_time
+        # Without any samples (e.g. a missing recording) there are no rates
+        path_info["distance_per_time"] = self.total_distance / last_time if last_time != 0 else float("nan")
+        path_info["turn_per_time"] = self.total_turn / last_time if last_time != 0 else float("nan")
+
+        return path_info
+
+#endregion
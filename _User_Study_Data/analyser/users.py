@@ -0,0 +1,234 @@
+import io
+import os
+import contextlib
+import numpy as np
+from .log_data import load_log_data
+from .rooms import get_room_index
+from .trajectories import PathAccumulator, load_trajectory, iter_trajectory_chunks
+from .downsampling import get_path_drift
+from .spatial import get_graph, score_spatial_graphs
+from .surveys import infer_survey_infos
+from .workers import map_in_workers
+from .profiling import profiler, profiled
+
+###########################################################################
+
+#region Extracting Data
+
+class UserInfo:
+    def __init__(self):
+        # Missing participants have no recorded samples, so their recording-based metrics are left out of the comparisons
+        self.missing = False
+
+        self.data = {}
+
+        self.data["prestudy"] = {}
+
+        self.data["path"] = {}
+        
+        self.data["poststudy"] = {}
+
+        self.data["spatial"] = {}
+
+    @profiled("path_metrics")
+    def infer_path_info(self, trajectory, rooms_info, portals, labels = None):
+        path_accumulator = PathAccumulator(rooms_info, portals)
+        path_accumulator.add(trajectory, labels)
+
+        self.data["path"] = path_accumulator.get_path_info()
+        self.missing = path_accumulator.last_sample is None
+
+    @profiled("path_metrics")
+    def infer_path_info_from_chunks(self, trajectory_chunks, rooms_info, portals):
+        path_accumulator = PathAccumulator(rooms_info, portals)
+        for trajectory_chunk in trajectory_chunks:
+            path_accumulator.add(trajectory_chunk)
+
+        self.data["path"] = path_accumulator.get_path_info()
+        self.missing = path_accumulator.last_sample is None
+
+    @profiled("path_drift")
+    def infer_drift_info(self, trajectory, rooms_info, portals, labels, reduced_sample_count):
+        # Path metrics of the full resolution trajectory, whose messages were already printed for the reduced one
+        path_accumulator = PathAccumulator(rooms_info, portals)
+        with contextlib.redirect_stdout(io.StringIO()):
+            path_accumulator.add(trajectory, labels)
+
+        self.data["drift"] = get_path_drift(path_accumulator.get_path_info(), self.data["path"], len(trajectory), reduced_sample_count)
+
+    @profiled("spatial_scoring")
+    def infer_spatial_info(self, id_graph, truth_graph):
+        spatial_scores = score_spatial_graphs([id_graph], [list(self.data["path"]["visited"].keys())], truth_graph)
+
+        for score_name, scores in spatial_scores.items():
+            self.data["spatial"][score_name] = int(scores[0])
+
+
+def read_trajectory(filename, loader, cache = None):
+    with profiler.stage("parse_trajectory"):
+        if cache is None:
+            trajectory = loader(filename)
+        else:
+            trajectory = cache.get_array(filename, "trajectory", lambda: loader(filename))
+
+    profiler.count("samples_parsed", len(trajectory))
+    return trajectory
+
+def read_trajectory_chunks(filename, chunk_size):
+    try:
+        trajectory_chunks = iter_trajectory_chunks(filename, chunk_size)
+        while True:
+            with profiler.stage("parse_trajectory"):
+                trajectory_chunk = next(trajectory_chunks, None)
+            if trajectory_chunk is None:
+                return
+
+            profiler.count("samples_parsed", len(trajectory_chunk))
+            yield trajectory_chunk
+    except FileNotFoundError:
+        print(f"File '{filename}' not found.")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+
+def read_participant_trajectory(id, cache = None):
+    # Raw game data (.dat, or .txt if unreadable), and the name of the file it was read from
+    trajectory = None
+    log_data_filename = str(id) + '.dat'
+    path_data_filename = str(id) + '.txt'
+    if os.path.exists(log_data_filename):
+        try:
+            trajectory = read_trajectory(log_data_filename, load_log_data, cache)
+            path_data_filename = log_data_filename
+        except Exception as e:
+            print(f"An error occurred reading '{log_data_filename}': {str(e)}")
+
+    if trajectory is None:
+        trajectory = np.empty((0, 8))
+        try:
+            trajectory = read_trajectory(path_data_filename, load_trajectory, cache)
+        except FileNotFoundError:
+            print(f"File '{path_data_filename}' not found.")
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+
+    return trajectory, path_data_filename
+
+def read_participant_labels(trajectory, path_data_filename, rooms_info, portals, cache = None):
+    # Room labels of the trajectory's samples, from the cache when the recording can be cached
+    room_index = get_room_index(rooms_info, portals)
+    if cache is None or not os.path.exists(path_data_filename):
+        return room_index.locate(trajectory[:, 1], trajectory[:, 3])
+
+    return cache.get_array(path_data_filename, "labels", lambda: room_index.locate(trajectory[:, 1], trajectory[:, 3]), list(rooms_info.items()), portals)
+
+def read_participant_data(id, rooms_info, cache = None):
+    # Trajectory and room labels of a participant, for stages after the analysis (which already printed any messages
+    # about missing or unreadable files, so they aren't printed again)
+    with contextlib.redirect_stdout(io.StringIO()):
+        trajectory, path_data_filename = read_participant_trajectory(id, cache)
+        labels = read_participant_labels(trajectory, path_data_filename, rooms_info, (id % 2) == 1, cache)
+
+    return trajectory, labels
+
+def get_user_info(id, rooms_info, truth_graph, cache = None, chunk_size = None, downsampler = None):
+    with profiler.for_participant(id), profiler.stage("participant"):
+        return read_user_info(id, rooms_info, truth_graph, cache, chunk_size, downsampler)
+
+def read_user_info(id, rooms_info, truth_graph, cache = None, chunk_size = None, downsampler = None):
+    user_info = UserInfo()
+    portals = (id % 2) == 1
+
+    if chunk_size is not None:
+        # Stream the raw game data (.txt) in blocks of samples, so memory use doesn't grow with the recording
+        user_info.infer_path_info_from_chunks(read_trajectory_chunks(str(id) + '.txt', chunk_size), rooms_info, portals)
+    else:
+        # Infer path info from raw game data (.dat, or .txt if unreadable) with rooms info
+        trajectory, path_data_filename = read_participant_trajectory(id, cache)
+        labels = read_participant_labels(trajectory, path_data_filename, rooms_info, portals, cache)
+
+        if downsampler is not None and len(trajectory) > 0:
+            # Path metrics from a resampled and/or simplified trajectory, optionally compared with the full resolution ones
+            with profiler.stage("downsampling"):
+                if cache is not None and os.path.exists(path_data_filename):
+                    # Cached with the labels as a last column, as simplification costs more than the path metrics it speeds up
+                    reduced = cache.get_array(path_data_filename, "reduced", lambda: np.column_stack(downsampler.reduce(trajectory, labels)), list(rooms_info.items()), portals, downsampler.get_settings())
+                    reduced_trajectory, reduced_labels = reduced[:, :8], reduced[:, 8].astype(int)
+                else:
+                    reduced_trajectory, reduced_labels = downsampler.reduce(trajectory, labels)
+            profiler.count("samples_reduced", len(trajectory) - len(reduced_trajectory))
+
+            user_info.infer_path_info(reduced_trajectory, rooms_info, portals, reduced_labels)
+            if downsampler.report_drift:
+                user_info.infer_drift_info(trajectory, rooms_info, portals, labels, len(reduced_trajectory))
+        else:
+            user_info.infer_path_info(trajectory, rooms_info, portals, labels)
+
+    # Infer spatial testing info from spatial text data (.txt) and truth graph
+    id_graph = get_graph(id, rooms_info)
+    user_info.infer_spatial_info(id_graph, truth_graph)
+
+    return user_info
+
+def get_user_info_and_output(id, rooms_info, truth_graph, cache = None, chunk_size = None, downsampler = None, profile = None):
+    # Runs in a worker process (or in order without workers), so printed messages are captured and handed back to be printed in ID order
+    # With profile (whether to trace memory), the worker's timings and counters are handed back too
+    if profile is not None:
+        profiler.reset()
+        profiler.start(profile)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            user_info, error = get_user_info(id, rooms_info, truth_graph, cache, chunk_size, downsampler), None
+        except Exception as e:
+            user_info, error = None, e
+
+    records = None
+    if profile is not None:
+        profiler.stop()
+        records = profiler.get_records()
+
+    return user_info, output.getvalue(), error, records
+
+def get_user_infos(count, rooms_info, workers = 1, cache = None, chunk_size = None, store = None, downsampler = None):
+
+    truth_graph = get_graph("Truth", rooms_info)
+
+    # With a metrics store, only participants whose input files changed since they were stored are processed again
+    ids = list(range(0, count))
+    downsampler_settings = downsampler.get_settings() + [downsampler.report_drift] if downsampler is not None else None
+    keys = {id: store.get_key(id, rooms_info, chunk_size, downsampler_settings) for id in ids} if store is not None else {}
+    changed_ids = [id for id in ids if store is None or not store.contains(id, keys[id])]
+
+    user_infos = {}
+    # Worker processes profile themselves, and this process's profiler records everything without workers
+    profile = profiler.trace_memory if profiler.enabled and workers > 1 else None
+    results = map_in_workers(get_user_info_and_output, workers, changed_ids, [rooms_info] * len(changed_ids), [truth_graph] * len(changed_ids), [cache] * len(changed_ids), [chunk_size] * len(changed_ids), [downsampler] * len(changed_ids), [profile] * len(changed_ids))
+
+    # Printed messages are replayed from the store for unchanged participants, so the output doesn't depend on what was stored
+    for id in ids:
+        if id in changed_ids:
+            user_info, output, error, records = next(results)
+        else:
+            user_info, output, error, records = store.get_user_info(id), store.get_output(id), None, None
+
+        print(output, end="")
+        if records is not None:
+            profiler.add_records(records)
+        if error is not None:
+            raise error
+
+        user_infos[id] = user_info
+        if store is not None and id in changed_ids:
+            store.set(id, keys[id], user_info, output)
+
+    if cache is not None:
+        cache.enforce_size_cap()
+    if store is not None:
+        store.save()
+
+    infer_survey_infos(user_infos)
+
+    return user_infos
+
+#endregion
@@ -0,0 +1,211 @@
+import io
+import os
+import json
+import contextlib
+import numpy as np
+from .quaternions import step_angles
+from .users import read_participant_trajectory, read_participant_labels
+from .cache import get_file_signature
+from .workers import map_in_workers
+from .profiling import profiled
+
+# Timelines of participants' room visits, for questions about when rather than how much (e.g. which room a participant
+# was in at 120s, how long they spent in the Aquarium in the first 2 minutes, or how long they took to reach the End).
+# A VisitIndex keeps, as sorted arrays:
+# - the start and end time and room of each visit, where a visit runs from the first to the last sample in a room
+# - the same visits grouped by room (in order within each room), with the running total of their durations
+# - each sample's time and the running total distance and turn up to it
+# so every query is a few binary searches. As in the path metrics, the step into a new room counts for no room, so a
+# room's dwell time over the whole session is its "total_time" and the distance and turn over it are the path's.
+#
+# Indexes are saved as "<id>.visits.npz" next to the recordings, and rebuilt when the recording or rooms change.
+
+###########################################################################
+
+#region Visit Index
+
+class VisitIndex:
+    def __init__(self, room_names, times, cumulative_distances, cumulative_turns, starts, ends, rooms, key = ""):
+        # Rooms are indices into room_names, whose last name is "" (not in any room bounds)
+        self.room_names = list(room_names)
+        self.times = times
+        self.cumulative_distances = cumulative_distances
+        self.cumulative_turns = cumulative_turns
+        self.starts = starts
+        self.ends = ends
+        self.rooms = rooms
+        self.key = key
+
+        # Visits grouped by room, rooms[room_visits[room_offsets[i]:room_offsets[i + 1]]] == i
+        self.room_visits = np.argsort(rooms, kind="stable")
+        self.room_offsets = np.concatenate(([0], np.cumsum(np.bincount(rooms, minlength=len(self.room_names)))))
+        self.room_starts = starts[self.room_visits]
+        self.room_ends = ends[self.room_visits]
+        self.cumulative_dwell_times = np.concatenate(([0], np.cumsum(self.room_ends - self.room_starts)))
+
+    @classmethod
+    def from_trajectory(cls, trajectory, labels, rooms_info, key = ""):
+        room_names = list(rooms_info.keys()) + [""]
+        if len(trajectory) == 0:
+            return cls(room_names, np.empty(0), np.empty(0), np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=int), key)
+
+        times = trajectory[:, 0]
+        entered = np.concatenate(([True], labels[1:] != labels[:-1]))
+        first_samples = np.flatnonzero(entered)
+        last_samples = np.append(first_samples[1:] - 1, len(trajectory) - 1)
+
+        # Steps into a new room don't count towards distance and turn
+        step_distances = np.concatenate(([0], np.linalg.norm(np.diff(trajectory[:, 1:4], axis=0), axis=1)))
+        step_turns = np.concatenate(([0], step_angles(trajectory[:, 4:8])))
+        cumulative_distances = np.cumsum(np.where(entered, 0, step_distances))
+        cumulative_turns = np.cumsum(np.where(entered, 0, step_turns))
+
+        rooms = np.where(labels[first_samples] == -1, len(room_names) - 1, labels[first_samples])
+
+        return cls(room_names, times, cumulative_distances, cumulative_turns, times[first_samples], times[last_samples], rooms, key)
+
+    def get_room_code(self, room_name):
+        return self.room_names.index(room_name) if room_name in self.room_names else None
+
+    def get_visit(self, time):
+        # Index of the visit of the last sample at or before time, or None outside the session
+        if len(self.times) == 0 or time < self.times[0] or time > self.times[-1]:
+            return None
+
+        return int(np.searchsorted(self.starts, time, side="right")) - 1
+
+    def get_room(self, time):
+        # Room of the last sample at or before time ("" when not in any room bounds), or None outside the session
+        visit = self.get_visit(time)
+        return self.room_names[self.rooms[visit]] if visit is not None else None
+
+    def get_visits(self, start_time = None, end_time = None):
+        # (room name, start, end) of the visits overlapping the time window
+        start_time = start_time if start_time is not None else -np.inf
+        end_time = end_time if end_time is not None else np.inf
+
+        first = np.searchsorted(self.ends, start_time, side="left")
+        last = np.searchsorted(self.starts, end_time, side="right")
+
+        return [(self.room_names[room], float(start), float(end)) for room, start, end in zip(self.rooms[first:last], self.starts[first:last], self.ends[first:last])]
+
+    def get_dwell_time(self, room_name, start_time = None, end_time = None):
+        # Time spent in the room within the time window
+        room = self.get_room_code(room_name)
+        if room is None:
+            return 0.0
+
+        start_time = start_time if start_time is not None else -np.inf
+        end_time = end_time if end_time is not None else np.inf
+        low = self.room_offsets[room]
+        high = self.room_offsets[room + 1]
+
+        # The room's visits that end after the window starts and start before it ends, trimmed to the window
+        first = low + np.searchsorted(self.room_ends[low:high], start_time, side="right")
+        last = low + np.searchsorted(self.room_starts[low:high], end_time, side="left")
+        if last <= first:
+            return 0.0
+
+        dwell_time = self.cumulative_dwell_times[last] - self.cumulative_dwell_times[first]
+        dwell_time -= max(0, start_time - self.room_starts[first])
+        dwell_time -= max(0, self.room_ends[last - 1] - end_time)
+
+        return float(dwell_time)
+
+    def get_first_visit_time(self, room_name):
+        # Time the room was first entered, or None if it never was
+        room = self.get_room_code(room_name)
+        if room is None or self.room_offsets[room] == self.room_offsets[room + 1]:
+            return None
+
+        return float(self.room_starts[self.room_offsets[room]])
+
+    def get_cumulative(self, cumulative_values, time):
+        # Running total up to the last sample at or before time
+        sample = np.searchsorted(self.times, time, side="right") - 1
+        return cumulative_values[sample] if sample >= 0 else 0
+
+    def get_distance(self, start_time = None, end_time = None):
+        start_time = start_time if start_time is not None else -np.inf
+        end_time = end_time if end_time is not None else np.inf
+        return float(self.get_cumulative(self.cumulative_distances, end_time) - self.get_cumulative(self.cumulative_distances, start_time))
+
+    def get_turn(self, start_time = None, end_time = None):
+        start_time = start_time if start_time is not None else -np.inf
+        end_time = end_time if end_time is not None else np.inf
+        return float(self.get_cumulative(self.cumulative_turns, end_time) - self.get_cumulative(self.cumulative_turns, start_time))
+
+    def save(self, filename):
+        # Written under a temporary name first, so an interrupted run never leaves a partial index
+        temporary_filename = filename + "." + str(os.getpid()) + ".tmp.npz"
+        np.savez_compressed(temporary_filename, room_names=np.array(self.room_names), times=self.times, cumulative_distances=self.cumulative_distances, cumulative_turns=self.cumulative_turns, starts=self.starts, ends=self.ends, rooms=self.rooms, key=np.array(self.key))
+        os.replace(temporary_filename, filename)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as arrays:
+            return cls(arrays["room_names"].tolist(), arrays["times"], arrays["cumulative_distances"], arrays["cumulative_turns"], arrays["starts"], arrays["ends"], arrays["rooms"], str(arrays["key"]))
+
+#endregion
+
+###########################################################################
+
+#region Participants
+
+def get_visit_index_key(id, rooms_info):
+    # The recordings (their signatures, as the cache and metrics store use) and rooms the index was built from
+    filenames = [str(id) + ".dat", str(id) + ".txt"]
+    signatures = [[filename, get_file_signature(filename)] for filename in filenames]
+
+    return json.dumps([list(rooms_info.items()), (id % 2) == 1, signatures])
+
+def get_visit_index(id, rooms_info, cache = None, rebuild = False):
+    # The participant's saved index, or a new one (saved for next time) if there's none or it's out of date
+    filename = str(id) + ".visits.npz"
+    key = get_visit_index_key(id, rooms_info)
+    if not rebuild and os.path.exists(filename):
+        try:
+            visit_index = VisitIndex.load(filename)
+            if visit_index.key == key:
+                return visit_index
+        except Exception as e:
+            print(f"Ignoring unreadable visit index '{filename}': {str(e)}")
+
+    trajectory, path_data_filename = read_participant_trajectory(id, cache)
+    labels = read_participant_labels(trajectory, path_data_filename, rooms_info, (id % 2) == 1, cache)
+
+    visit_index = VisitIndex.from_trajectory(trajectory, labels, rooms_info, key)
+    if len(trajectory) > 0:
+        visit_index.save(filename)
+
+    return visit_index
+
+def build_visit_index(id, rooms_info, cache = None):
+    # Built after the analysis, which has already reported any missing recordings
+    with contextlib.redirect_stdout(io.StringIO()):
+        return len(get_visit_index(id, rooms_info, cache).starts)
+
+@profiled("visit_indexes")
+def build_visit_indexes(count, rooms_info, workers = 1, cache = None):
+    # Brings the indexes of participants 0 to count - 1 up to date, returning how many visits each has
+    ids = list(range(0, count))
+    return list(map_in_workers(build_visit_index, workers, ids, [rooms_info] * count, [cache] * count))
+
+def print_visit_queries(id, rooms_info, time = None, window = None, room_name = None, cache = None):
+    visit_index = get_visit_index(id, rooms_info, cache)
+
+    print("#")
+    print("Participant " + str(id) + ":", len(visit_index.starts), "visits over", str(round(float(visit_index.times[-1]) if len(visit_index.times) > 0 else 0, 1)) + "s")
+    if time is not None:
+        room = visit_index.get_room(time)
+        print("Room at " + str(time) + "s =", room if room != "" else "(none)")
+    if window is not None:
+        print("Visits in " + str(window) + "s =", visit_index.get_visits(*window))
+        print("Distance in " + str(window) + "s =", str(round(visit_index.get_distance(*window), 3)) + "m")
+        print("Turn in " + str(window) + "s =", str(round(visit_index.get_turn(*window), 3)) + "°")
+    if room_name is not None:
+        first_visit_time = visit_index.get_first_visit_time(room_name)
+        print("First reached " + room_name + " at", str(round(first_visit_time, 3)) + "s" if first_visit_time is not None else "never")
+        print("Time in " + room_name + (" in " + str(window) + "s" if window is not None else "") + " =", str(round(visit_index.get_dwell_time(room_name, *(window if window is not None else [])), 3)) + "s")
+
+#endregion
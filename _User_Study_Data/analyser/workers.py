@@ -0,0 +1,14 @@
+from concurrent.futures import ProcessPoolExecutor
+
+# Every stage that spreads work over processes (participants, pairs of participants, resamples) goes through
+# map_in_workers, so the function and its arguments are pickled to worker processes with workers > 1, and
+# called in order in this process otherwise.
+
+def map_in_workers(function, workers, *iterables):
+    # Results in the order of the iterables, as they're consumed. The worker processes are shut down once the results run out or are dropped
+    if workers <= 1:
+        yield from map(function, *iterables)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(function, *iterables)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The analyser package and the recordings live in _User_Study_Data, one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,38 @@
+import os
+import numpy as np
+import pytest
+from analyser.log_data import load_log_data
+from analyser.trajectories import load_trajectory
+from analyser.benchmark import write_log_data
+
+# The .dat decoder against the .txt recordings written at the same time, and against the benchmark's writer
+
+DATA_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RECORDING_IDS = sorted([int(filename[:-4]) for filename in os.listdir(DATA_DIRECTORY) if filename.endswith(".dat") and filename[:-4].isdigit()])
+
+###########################################################################
+
+#region Tests
+
+@pytest.mark.parametrize("id", RECORDING_IDS)
+def test_log_data_matches_text(id):
+    # The .txt files round every value to 3 decimals
+    trajectory = load_log_data(os.path.join(DATA_DIRECTORY, str(id) + ".dat"))
+    expected = load_trajectory(os.path.join(DATA_DIRECTORY, str(id) + ".txt"))
+
+    assert trajectory.shape == expected.shape
+    assert np.abs(trajectory - expected).max() <= 5e-4 + 1e-9
+
+# Counts around the list's capacity, with no unused slots and with runs of under and over 256 null slots
+@pytest.mark.parametrize("count", [0, 1, 2, 4, 5, 300, 700])
+def test_write_log_data_round_trip(tmp_path, count):
+    rng = np.random.default_rng(count)
+    trajectory = rng.normal(scale=100, size=(count, 8)).astype(np.float32).astype(np.float64)
+
+    filename = str(tmp_path / "0.dat")
+    write_log_data(filename, trajectory)
+
+    assert np.array_equal(load_log_data(filename), trajectory)
+
+#endregion
@@ -0,0 +1,151 @@
+import io
+import os
+import math
+import contextlib
+import numpy as np
+import pytest
+from analyser.rooms import get_rooms_info
+from analyser.trajectories import load_trajectory
+from analyser.users import UserInfo
+
+# Regression test of the vectorised path inference against the original per-line implementation, on the shipped recordings
+
+DATA_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RECORDING_IDS = sorted([int(filename[:-4]) for filename in os.listdir(DATA_DIRECTORY) if filename.endswith(".txt") and filename[:-4].isdigit()])
+
+###########################################################################
+
+#region Baseline
+
+# Frozen copies of the original in_room, angle and UserInfo.infer_path_info
+
+def in_room(x, z, rooms_info, portals = False):
+    for room_name in list(rooms_info.keys()):
+        room = rooms_info[room_name]
+        room_x = room[0] * 3
+        room_z = room[1] * 6
+
+        portal_mutlipler = 100
+        if portals:
+            room_x *= portal_mutlipler
+            room_z *= portal_mutlipler
+
+        if abs(x - room_x) < 3/2 and abs(z - room_z) < 6/2:
+
+            # Introduce special case to handle "Recording start bounds" inconsistencies
+            if not portals and room_name == "Start" and z > 2.8:
+                return "Dinosaur"
+            
+            return room_name
+        
+    print("ERROR: Player not in any room bounds at x=" + str(x) + ", z=" + str(z))
+    return ""
+
+def angle(q1, q2, degrees = True):
+
+    # Inspired code from:
+    # https://forum.unity.com/threads/quaternion-angle-implementation.572632/
+
+    quaternion1 = np.array([q1[3], q1[0], q1[1], q1[2]])
+    quaternion2 = np.array([q2[3], q2[0], q2[1], q2[2]])
+
+    dot_product = min(np.dot(quaternion1, quaternion2), 1)
+
+    angle_radians = np.arccos(dot_product) * 2
+    angle_degrees = np.degrees(angle_radians)
+
+    return angle_degrees if degrees else angle_radians
+
+def infer_path_info(raw_data, rooms_info, portals):
+    path_info = {}
+    path_info["visited"] = {}
+
+    raw_lines = raw_data.split("\n")
+
+    last_time = 0
+    last_position = ()
+    last_rotation = ()
+    last_room = ""
+    room_visits = 0
+
+    total_distance = 0
+    total_turn = 0
+
+    for i in range(len(raw_lines) - 1):
+        line_info = raw_lines[i].split(",")
+
+        time = float(line_info[0])
+        position = (float(line_info[1]), float(line_info[2]), float(line_info[3]))
+        rotation = (float(line_info[4]), float(line_info[5]), float(line_info[6]), float(line_info[7]))
+
+        current_room = in_room(position[0], position[2], rooms_info, portals)
+
+        if current_room not in path_info["visited"]:
+            path_info["visited"][current_room] = {}
+            path_info["visited"][current_room]["order"] = len(path_info["visited"]) - 1
+            path_info["visited"][current_room]["sequence"] = []
+            path_info["visited"][current_room]["total_time"] = 0
+            path_info["visited"][current_room]["total_distance"] = 0
+            path_info["visited"][current_room]["total_turn"] = 0
+
+        if current_room != last_room:
+            path_info["visited"][current_room]["sequence"].append(room_visits)
+            room_visits += 1
+        elif i > 0:
+            distance = math.dist(position, last_position)
+            turn = angle(rotation, last_rotation)
+
+            path_info["visited"][current_room]["total_time"] += time - last_time
+            path_info["visited"][current_room]["total_distance"] += distance
+            path_info["visited"][current_room]["total_turn"] += turn
+
+            total_distance += distance
+            total_turn += turn
+
+        last_time = time
+        last_position = position
+        last_rotation = rotation
+        last_room = current_room
+
+    path_info["total_room_visits"] = room_visits
+    path_info["total_time"] = last_time
+    path_info["distance_per_time"] = total_distance / last_time
+    path_info["turn_per_time"] = total_turn / last_time
+
+    return path_info
+
+#endregion
+
+###########################################################################
+
+#region Tests
+
+@pytest.mark.parametrize("id", RECORDING_IDS)
+def test_path_info_matches_baseline(id):
+    rooms_info = get_rooms_info()
+    portals = (id % 2) == 1
+    filename = os.path.join(DATA_DIRECTORY, str(id) + ".txt")
+
+    with open(filename, "r") as file:
+        raw_data = file.read()
+
+    user_info = UserInfo()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = infer_path_info(raw_data, rooms_info, portals)
+        user_info.infer_path_info(load_trajectory(filename), rooms_info, portals)
+    path_info = user_info.data["path"]
+
+    assert list(path_info["visited"].keys()) == list(expected["visited"].keys())
+    for room_name, expected_room in expected["visited"].items():
+        room = path_info["visited"][room_name]
+        assert room["order"] == expected_room["order"]
+        assert room["sequence"] == expected_room["sequence"]
+        for total in ["total_time", "total_distance", "total_turn"]:
+            assert room[total] == pytest.approx(expected_room[total], rel=1e-6, abs=1e-6)
+
+    assert path_info["total_room_visits"] == expected["total_room_visits"]
+    for name in ["total_time", "distance_per_time", "turn_per_time"]:
+        assert path_info[name] == pytest.approx(expected[name], rel=1e-6, abs=1e-6)
+
+#endregion
@@ -0,0 +1,47 @@
+import io
+import os
+import contextlib
+from analyser.rooms import get_rooms_info
+from analyser.users import get_user_infos
+
+# Reading every participant of the shipped data, where some participants have a sketch map and surveys but no recording
+
+DATA_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MISSING_IDS = [id for id in range(32) if not os.path.exists(os.path.join(DATA_DIRECTORY, str(id) + ".dat")) and not os.path.exists(os.path.join(DATA_DIRECTORY, str(id) + ".txt"))]
+
+###########################################################################
+
+#region Tests
+
+def read_user_infos(workers):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        user_infos = get_user_infos(32, get_rooms_info(), workers)
+
+    return user_infos, output.getvalue()
+
+def test_user_infos_with_missing_recordings(monkeypatch):
+    monkeypatch.chdir(DATA_DIRECTORY)
+    user_infos, output = read_user_infos(1)
+
+    assert sorted(user_infos.keys()) == list(range(32))
+    assert [id for id in range(32) if user_infos[id].missing] == MISSING_IDS
+    for id in MISSING_IDS:
+        assert "File '" + str(id) + ".txt' not found." in output
+        assert user_infos[id].data["path"]["total_room_visits"] == 0
+        assert len(user_infos[id].data["spatial"]) > 0
+        assert len(user_infos[id].data["poststudy"]) > 0
+
+def test_user_infos_with_workers(monkeypatch):
+    # Messages are printed in ID order whichever worker read the participant
+    monkeypatch.chdir(DATA_DIRECTORY)
+    user_infos, output = read_user_infos(1)
+    worker_user_infos, worker_output = read_user_infos(2)
+
+    assert worker_output == output
+    for id in range(32):
+        assert worker_user_infos[id].missing == user_infos[id].missing
+        assert worker_user_infos[id].data["spatial"] == user_infos[id].data["spatial"]
+
+#endregion